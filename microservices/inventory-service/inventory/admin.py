@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import ProductCategory, Product, InventoryTransaction
+from django.db import transaction
+from .models import ProductCategory, Product, InventoryTransaction, OutboxEvent, StockReservation
+from .outbox import enqueue_product_changes, record_stock_transaction, save_product
 
 
 @admin.register(ProductCategory)
@@ -7,18 +9,76 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description', 'created_at']
     search_fields = ['name']
 
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if change and 'name' in form.changed_data:
+                # El nombre va desnormalizado en los documentos de sus productos
+                enqueue_product_changes(list(obj.products.values_list('sku', flat=True)))
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['sku', 'name', 'category', 'stock_quantity', 'unit_price', 'supplier']
     list_filter = ['category', 'supplier']
-    search_fields = ['sku', 'name', 'description']
+    # SKU exacto y prefijo de nombre sin distinguir mayúsculas (índices UPPER(sku)/UPPER(name)).
+    # No busca en description: la búsqueda completa está en /inventory/search
+    search_fields = ['=sku', '^name']
     readonly_fields = ['created_at', 'updated_at']
 
+    # Los cambios hechos desde el admin llegan a MongoDB por el outbox (misma transacción)
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            save_product(obj)
+            if change and 'sku' in form.changed_data:
+                # El relay borra del read model el documento del SKU anterior
+                enqueue_product_changes([form.initial['sku']])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            sku = obj.sku
+            obj.delete()
+            enqueue_product_changes([sku])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            skus = list(queryset.values_list('sku', flat=True))
+            queryset.delete()
+            enqueue_product_changes(skus)
+
 
 @admin.register(InventoryTransaction)
 class InventoryTransactionAdmin(admin.ModelAdmin):
     list_display = ['product', 'transaction_type', 'quantity', 'previous_stock', 'new_stock', 'created_at']
     list_filter = ['transaction_type', 'created_at']
+    # previous_stock lo fija record_stock_transaction con el stock de la fila bloqueada
+    readonly_fields = ['previous_stock', 'created_at']
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Corregir el registro de auditoría no modifica el stock
+            super().save_model(request, obj, form, change)
+            return
+        # Una transacción nueva aplica el stock y encola el cambio en el outbox
+        created = record_stock_transaction(
+            obj.product, obj.transaction_type, obj.quantity, obj.new_stock, notes=obj.notes
+        )
+        obj.pk = created.pk
+        obj.previous_stock = created.previous_stock
+        obj.new_stock = created.new_stock
+        obj.created_at = created.created_at
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['sku', 'created_at']
+    search_fields = ['sku']
     readonly_fields = ['created_at']
 
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'status', 'created_at', 'released_at']
+    list_filter = ['status']
+    search_fields = ['=reference']
+    readonly_fields = ['created_at', 'released_at']
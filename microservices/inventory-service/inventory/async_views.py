@@ -0,0 +1,94 @@
+"""
+Vistas asíncronas (ASGI) de lectura del Inventory Service
+
+Versiones async de nosql-list, stats y health con Motor: la espera a
+MongoDB no ocupa un hilo, así que la concurrencia no depende del número
+de hilos del worker. No pasan por la caché de lecturas (es síncrona);
+para comparar contra WSGI usar INVENTORY_CACHE_ENABLED=False.
+"""
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from .mongodb_async import get_async_inventory_collection, get_async_stats_collection
+from .mongodb_client import STATS_ID, rebuild_inventory_stats
+from .profiles import MONGO_FIELDS, mongo_projection, resolve_fields
+from .views import (
+    _encode_data, _envelope_response, _keyset_filter, _parse_keyset_params, format_stats
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def health_check(request):
+    """Health check endpoint (ASGI)"""
+    return JsonResponse({
+        'status': 'ok',
+        'service': 'inventory-service',
+        'mode': 'async'
+    })
+
+
+async def nosql_list(request):
+    """nosql-list sobre Motor: mismos parámetros y respuesta que la vista síncrona"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    start_time = time.time()
+
+    paginated = 'after' in request.GET or 'limit' in request.GET
+    try:
+        after, limit = _parse_keyset_params(request)
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not paginated:
+        limit = 10000
+
+    try:
+        cursor = (
+            get_async_inventory_collection()
+            .find(_keyset_filter(after), mongo_projection(fields))
+            .sort([('name', 1), ('_id', 1)])
+            .limit(limit)
+            .batch_size(min(limit, settings.MONGODB_BATCH_SIZE))
+        )
+        results = await cursor.to_list(length=limit)
+        for item in results:
+            item['_id'] = str(item['_id'])
+
+        meta = {
+            'count': len(results),
+            'database': 'MongoDB',
+            'query_type': 'Simple Find (CQRS, async)'
+        }
+        if paginated:
+            last = results[-1] if len(results) == limit else None
+            meta['query_type'] = 'Keyset Page (CQRS, async)'
+            meta['next_after'] = f"{last['name']},{last['_id']}" if last else None
+        data_json = _encode_data(results, meta)
+        meta['elapsed_time_ms'] = round((time.time() - start_time) * 1000, 2)
+        return _envelope_response(data_json, meta)
+
+    except Exception as e:
+        logger.error(f"Error in async nosql_list: {e}")
+        return JsonResponse({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=500)
+
+
+async def inventory_stats(request):
+    """Estadísticas materializadas leídas con Motor; se recalculan si faltan o están marcadas"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        stats = await get_async_stats_collection().find_one({'_id': STATS_ID})
+        if stats is None or stats.get('stale'):
+            # Agregación completa poco frecuente: se reutiliza la versión síncrona
+            stats = await sync_to_async(rebuild_inventory_stats, thread_sensitive=False)()
+        return JsonResponse(format_stats(stats))
+
+    except Exception as e:
+        logger.error(f"Error in async inventory_stats: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,288 @@
+"""
+Caché read-through de las lecturas del inventario
+
+Dos niveles: un LRU en memoria del proceso, acotado en entradas y en
+bytes, y opcionalmente un nivel compartido (backend de CACHES
+'inventory_shared', p.ej. Redis; LocMemCache en local y pruebas).
+
+La invalidación no borra claves (get_cache_versions):
+- La clave incluye la época (resincronizaciones completas) y las
+  versiones de las familias de la lectura ('catalog', 'low_stock',
+  'stats'), que solo cambian cuando una escritura afecta a esa familia.
+- Cada entrada guarda la versión de los buckets de los SKUs que contiene
+  y deja de servirse cuando alguno cambia: una reserva de stock invalida
+  las páginas que muestran ese SKU, no todas las lecturas.
+
+Un fallo de caché con muchas peticiones concurrentes ejecuta una sola
+consulta: las peticiones del mismo proceso esperan a la primera
+(single-flight) y, con nivel compartido, los demás procesos esperan al
+proceso que tomó el lock de la clave.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from .mongodb_client import get_cache_versions, sku_bucket
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = 'inventory_shared'
+
+
+def make_key(namespace, version, params):
+    """Clave de caché a partir del nombre de la consulta y sus parámetros (dict o QueryDict)"""
+    if hasattr(params, 'lists'):
+        params = dict(params.lists())
+    digest = hashlib.sha1(repr(sorted(params.items())).encode('utf-8')).hexdigest()
+    return f"inventory:{namespace}:{version}:{digest}"
+
+
+def estimate_size(value):
+    """Tamaño aproximado en memoria (bytes) de un valor cacheado"""
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Caché LRU con TTL en memoria del proceso, segura entre hilos, acotada
+    en entradas (max_size) y en bytes estimados (max_bytes). Los valores
+    más grandes que max_bytes no se guardan.
+    """
+
+    def __init__(self, max_size=128, ttl=30, max_bytes=None, sizeof=estimate_size):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.oversized = 0
+
+    def get(self, key):
+        """Devolver el valor cacheado o None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                self.oversized += 1
+                return
+            self._entries[key] = (value, time.time() + self.ttl, size)
+            self.bytes += size
+            while len(self._entries) > self.max_size or (self.max_bytes and self.bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Flight:
+    """Carga en curso de una clave (single-flight)"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadThroughCache:
+    """
+    Caché read-through de dos niveles con protección contra estampidas.
+    Los valores cacheados se comparten entre peticiones: no deben mutarse.
+    """
+
+    def __init__(self, max_size=128, ttl=30, shared=None, lock_timeout=5.0, version_ttl=1.0,
+                 max_bytes=None):
+        self.local = LRUCache(max_size=max_size, ttl=ttl, max_bytes=max_bytes)
+        self.shared = shared
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.version_ttl = version_ttl
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidated = 0
+
+    def get_or_load(self, namespace, params, loader, families=('catalog',)):
+        """
+        Devolver (valor, origen) de la consulta `namespace` con `params`.
+        `loader` devuelve (valor, skus): los SKUs cuyo cambio invalida el
+        valor (None si solo depende de `families`).
+        origen es 'local', 'shared', 'coalesced' o 'miss' (se ejecutó loader).
+        """
+        versions = get_cache_versions(self.version_ttl)
+        family_versions = [versions['epoch']] + [versions['families'].get(family, 0) for family in families]
+        key = make_key(namespace, '.'.join(str(v) for v in family_versions), params)
+
+        entry = self._valid(self.local.get(key), versions)
+        if entry is not None:
+            self.hits += 1
+            return entry[0], 'local'
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            # Otra petición del proceso ya está consultando esta clave
+            flight.event.wait(self.lock_timeout)
+            if flight.event.is_set() and flight.error is None:
+                self.coalesced += 1
+                return flight.value, 'coalesced'
+            return self._load(key, loader, versions)
+
+        try:
+            flight.value, source = self._load(key, loader, versions)
+            return flight.value, source
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            flight.event.set()
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _valid(self, entry, versions):
+        """La entrada (valor, {bucket: versión}) si ninguno de sus SKUs cambió"""
+        if entry is None:
+            return None
+        skus = versions['skus']
+        if any(skus.get(bucket, 0) != version for bucket, version in entry[1].items()):
+            self.invalidated += 1
+            return None
+        return entry
+
+    def _load(self, key, loader, versions):
+        """Leer del nivel compartido o ejecutar loader (con lock entre procesos)"""
+        if self.shared is None:
+            return self._miss(key, loader, versions)[0], 'miss'
+
+        entry = self._valid(self.shared.get(key), versions)
+        if entry is not None:
+            self.shared_hits += 1
+            self.local.set(key, entry)
+            return entry[0], 'shared'
+
+        lock_key = f"{key}:lock"
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                entry = self._miss(key, loader, versions)
+                self.shared.set(key, entry, self.ttl)
+                return entry[0], 'miss'
+            finally:
+                self.shared.delete(lock_key)
+
+        # Otro proceso está consultando: esperar su resultado
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = self._valid(self.shared.get(key), versions)
+            if entry is not None:
+                self.shared_hits += 1
+                self.local.set(key, entry)
+                return entry[0], 'shared'
+        return self._miss(key, loader, versions)[0], 'miss'
+
+    def _miss(self, key, loader, versions):
+        self.misses += 1
+        value, skus = loader()
+        # Versiones leídas antes de la consulta: un cambio concurrente invalida la entrada
+        buckets = {sku_bucket(sku) for sku in skus or ()}
+        entry = (value, {bucket: versions['skus'].get(bucket, 0) for bucket in buckets})
+        self.local.set(key, entry)
+        return entry
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        return {
+            'size': len(self.local),
+            'bytes': self.local.bytes,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'invalidated': self.invalidated,
+            'evictions': self.local.evictions,
+            'oversized': self.local.oversized,
+            'shared': self.shared is not None,
+        }
+
+
+def _shared_backend():
+    try:
+        return caches[SHARED_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+
+
+_read_cache = None
+
+
+def get_read_cache():
+    """Obtener (o crear) la caché de lecturas del proceso"""
+    global _read_cache
+    if _read_cache is None:
+        _read_cache = ReadThroughCache(
+            max_size=settings.INVENTORY_CACHE_MAX_SIZE,
+            ttl=settings.INVENTORY_CACHE_TTL,
+            shared=_shared_backend(),
+            lock_timeout=settings.INVENTORY_CACHE_LOCK_TIMEOUT,
+            version_ttl=settings.INVENTORY_CACHE_VERSION_TTL,
+            max_bytes=settings.INVENTORY_CACHE_MAX_BYTES,
+        )
+    return _read_cache
+
+
+def cached_read(namespace, params, loader, families=('catalog',)):
+    """
+    Lectura a través de la caché; con INVENTORY_CACHE_ENABLED=False ejecuta
+    loader directamente. `loader` devuelve (valor, skus) y `families` son
+    las familias de versiones de las que depende la lectura.
+    Devuelve (valor, origen).
+    """
+    if not settings.INVENTORY_CACHE_ENABLED:
+        return loader()[0], 'disabled'
+    return get_read_cache().get_or_load(namespace, params, loader, families)
@@ -0,0 +1,28 @@
+"""
+Gestión de índices del read model: crea los índices declarados en MongoDB
+"""
+from django.core.management.base import BaseCommand
+from inventory.mongodb_client import INVENTORY_INDEXES, ensure_indexes, get_mongo_client
+
+
+class Command(BaseCommand):
+    help = 'Crea los índices declarados de la colección inventory (Read Model)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Eliminar índices no declarados y recrear los que cambiaron de claves')
+
+    def handle(self, *args, **options):
+        _, db = get_mongo_client()
+        created, dropped = ensure_indexes(db, prune=options['prune'])
+
+        for name in dropped:
+            self.stdout.write(f"Dropped index {name}")
+        for name in created:
+            self.stdout.write(f"Created index {name}")
+
+        existing = db['inventory'].index_information()
+        for name, keys, _ in INVENTORY_INDEXES:
+            state = 'ok' if name in existing else 'missing'
+            fields = ', '.join(field for field, _ in keys)
+            self.stdout.write(f"  {name:<20} ({fields}) {state}")
@@ -0,0 +1,13 @@
+"""
+Recalcular products.transaction_count desde inventory_transactions
+"""
+from django.core.management.base import BaseCommand
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Corrige el contador transaction_count de los productos (tras cargas masivas o SQL manual)'
+
+    def handle(self, *args, **options):
+        fixed = Product.recount_transactions()
+        self.stdout.write(f"Fixed transaction_count on {fixed} products")
@@ -0,0 +1,32 @@
+"""
+Relay del outbox: propaga los cambios pendientes de PostgreSQL a MongoDB
+"""
+import time
+from django.core.management.base import BaseCommand
+from inventory.outbox import relay_batch
+
+
+class Command(BaseCommand):
+    help = 'Drena el outbox de inventario y aplica los cambios en MongoDB (Read Model)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Eventos por lote (default: 1000)')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Segundos de espera cuando el outbox está vacío (default: 1.0)')
+        parser.add_argument('--once', action='store_true',
+                            help='Drenar el outbox una vez y terminar')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        while True:
+            events, skus, lag = relay_batch(batch_size)
+            if events:
+                self.stdout.write(
+                    f"Relayed {events} events ({skus} products), lag {lag:.0f} ms"
+                )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
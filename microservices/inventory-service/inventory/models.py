@@ -1,7 +1,10 @@
 """
 Models for Inventory Service - Write Model (PostgreSQL)
 """
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Upper
 
 
 class ProductCategory(models.Model):
@@ -28,16 +31,45 @@ class Product(models.Model):
     stock_quantity = models.IntegerField(default=0)
     min_stock_level = models.IntegerField(default=10)
     supplier = models.CharField(max_length=200, blank=True)
+    # Contador de InventoryTransaction, mantenido al registrar cada transacción
+    transaction_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'products'
         ordering = ['name']
+        indexes = [
+            # Sincronización incremental por marca de agua
+            models.Index(fields=['updated_at'], name='products_updated_at_idx'),
+            # ORDER BY name LIMIT n de sql-list
+            models.Index(fields=['name'], name='products_name_idx'),
+            # Búsqueda del admin: =sku es UPPER(sku) = UPPER(q) y ^name es
+            # UPPER(name) LIKE UPPER('q%'), que el btree plano no puede usar
+            models.Index(OpClass(Upper('sku'), name='text_pattern_ops'), name='products_upper_sku_idx'),
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), name='products_upper_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
+    @classmethod
+    def recount_transactions(cls):
+        """
+        Recalcular transaction_count desde inventory_transactions con un
+        solo UPDATE. Devuelve el número de productos corregidos.
+        """
+        counts = (
+            InventoryTransaction.objects.filter(product=OuterRef('pk'))
+            .order_by().values('product').annotate(n=Count('id')).values('n')
+        )
+        actual = Coalesce(Subquery(counts), 0)
+        return (
+            cls.objects.annotate(actual=actual)
+            .exclude(transaction_count=models.F('actual'))
+            .update(transaction_count=actual)
+        )
+
 
 class InventoryTransaction(models.Model):
     """Transacciones de inventario para auditoría"""
@@ -58,7 +90,53 @@ class InventoryTransaction(models.Model):
     class Meta:
         db_table = 'inventory_transactions'
         ordering = ['-created_at']
+        indexes = [
+            # Historial de un producto por fecha
+            models.Index(fields=['product', 'created_at'], name='inv_tx_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.product.sku} - {self.quantity}"
 
+
+class StockReservation(models.Model):
+    """
+    Reserva de stock de un pedido, una por referencia: reintentar la misma
+    reserva no vuelve a descontar y la devolución usa las cantidades guardadas
+    """
+    STATUSES = [
+        ('ACTIVE', 'Activa'),
+        ('RELEASED', 'Liberada'),
+        # Referencia cerrada sin reserva: una reserva tardía con ella no se aplica
+        ('CANCELLED', 'Cancelada'),
+    ]
+
+    reference = models.CharField(max_length=100, unique=True)
+    # [{'sku': ..., 'quantity': ...}] en el orden reservado
+    items = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUSES, default='ACTIVE')
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'inventory_reservations'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.reference} - {self.status}"
+
+    def quantities(self):
+        return {item['sku']: item['quantity'] for item in self.items}
+
+
+class OutboxEvent(models.Model):
+    """Cambio pendiente de propagar del Write Model al Read Model (outbox)"""
+    sku = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_outbox'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.sku} - {self.created_at}"
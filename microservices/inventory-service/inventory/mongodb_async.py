@@ -0,0 +1,48 @@
+"""
+Cliente asíncrono de MongoDB (Motor) para las vistas ASGI del Read Model
+"""
+import asyncio
+import threading
+from motor.motor_asyncio import AsyncIOMotorClient
+from django.conf import settings
+
+# Un cliente por event loop: Motor queda ligado al loop en que se crea. Bajo
+# ASGI hay un loop por proceso; si algo ejecuta las vistas en loops de corta
+# vida (async_to_sync crea uno por llamada) los clientes de loops cerrados se
+# cierran al crear el siguiente. El cliente referencia a su loop, así que un
+# WeakKeyDictionary no los liberaría.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _close_finished_clients():
+    """Cerrar y descartar los clientes cuyo event loop ya terminó"""
+    for loop in [loop for loop in _clients if loop.is_closed()]:
+        _clients.pop(loop).close()
+
+
+def get_async_db():
+    """Base de datos del read model para el event loop actual"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        with _clients_lock:
+            _close_finished_clients()
+            client = _clients.get(loop)
+            if client is None:
+                client = AsyncIOMotorClient(
+                    host=settings.MONGODB_HOST,
+                    port=settings.MONGODB_PORT,
+                    serverSelectionTimeoutMS=5000,
+                    io_loop=loop,
+                )
+                _clients[loop] = client
+    return client[settings.MONGODB_DB]
+
+
+def get_async_inventory_collection():
+    return get_async_db()['inventory']
+
+
+def get_async_stats_collection():
+    return get_async_db()['inventory_stats']
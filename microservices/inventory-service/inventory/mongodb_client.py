@@ -1,9 +1,13 @@
 """
 MongoDB Client for Read Model (CQRS)
 """
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, TEXT, InsertOne, ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from django.conf import settings
+from .search import search_tokens
 import logging
+import time
+import zlib
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +15,45 @@ logger = logging.getLogger(__name__)
 _mongo_client = None
 _mongo_db = None
 
+# Índices declarados del read model: (nombre, claves, opciones)
+INVENTORY_INDEXES = [
+    # Paginación keyset de nosql-list: ORDER BY name, _id
+    ('name_id', [('name', ASCENDING), ('_id', ASCENDING)], {}),
+    # Solo indexa los productos con stock bajo (consultas de reposición)
+    ('low_stock_name_id', [('is_low_stock', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)],
+     {'partialFilterExpression': {'is_low_stock': True}}),
+    # Igualdad por categoría / proveedor + orden keyset (name, _id)
+    ('category_name_id', [('category.id', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)], {}),
+    ('supplier_name_id', [('supplier', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)], {}),
+    # Rango de precio ordenado por (unit_price, _id)
+    ('price_id', [('unit_price', ASCENDING), ('_id', ASCENDING)], {}),
+    # Búsqueda: texto completo con relevancia y prefijos para typeahead
+    ('search_text', [('sku', TEXT), ('name', TEXT), ('description', TEXT)],
+     {'weights': {'sku': 10, 'name': 5, 'description': 1}, 'default_language': 'spanish'}),
+    ('search_tokens_name_id', [('search_tokens', ASCENDING), ('name', ASCENDING), ('_id', ASCENDING)], {}),
+]
+
+# Documento de estadísticas materializadas (colección inventory_stats)
+STATS_ID = 'summary'
+
+# Campos de un documento que afectan a las estadísticas
+STATS_PROJECTION = {'category': 1, 'unit_price': 1, 'stock_quantity': 1, 'min_stock_level': 1}
+
+# Código de error de MongoDB para clave duplicada
+DUPLICATE_KEY_ERROR = 11000
+
+# Versiones de datos para invalidar cachés de lectura (sync_metadata, _id: cache_version):
+# 'version' (época, invalida todo), 'families.<familia>' y 'skus.<bucket>' (por documento)
+CACHE_VERSION_ID = 'cache_version'
+_cache_versions = (None, 0)
+
+# Familias de lecturas: 'catalog' (pertenencia y orden de las listas: altas, bajas y campos
+# que no son de stock), 'low_stock' (conjunto is_low_stock) y 'stats' (agregados)
+CACHE_FAMILIES = ('catalog', 'low_stock', 'stats')
+
+# Campos que cambian con una reserva o ajuste de stock
+STOCK_FIELDS = {'stock_quantity', 'is_low_stock', 'updated_at'}
+
 
 def get_mongo_client():
     """Get or create MongoDB client"""
@@ -30,16 +73,310 @@ def get_mongo_client():
         except Exception as e:
             logger.error(f"Error connecting to MongoDB: {e}")
             raise
+
+        # Un fallo al crear índices (permisos, índice en conflicto) no debe
+        # hacer fallar la petición que abrió la conexión
+        try:
+            ensure_indexes(_mongo_db)
+        except Exception as e:
+            logger.error(f"Error ensuring MongoDB indexes (run ensure_mongo_indexes): {e}")
     
     return _mongo_client, _mongo_db
 
 
+def _same_keys(info, keys):
+    """Comparar un índice existente (index_information) con las claves declaradas"""
+    if any(direction == TEXT for _, direction in keys):
+        # Mongo guarda los índices de texto como _fts/_ftsx más los pesos
+        fields = {field for field, direction in keys if direction == TEXT}
+        return ('_fts', 'text') in list(info['key']) and set(info.get('weights', {})) == fields
+    return list(info['key']) == list(keys)
+
+
+def ensure_indexes(db, prune=False):
+    """
+    Crear (si no existen) los índices que usan las consultas del read model.
+    Con prune=True elimina los índices no declarados y recrea los que tienen
+    otras claves. Devuelve (creados, eliminados).
+    """
+    collection = db['inventory']
+    existing = collection.index_information()
+    created = []
+    dropped = []
+
+    for name, keys, options in INVENTORY_INDEXES:
+        if name in existing:
+            if _same_keys(existing[name], keys):
+                continue
+            if not prune:
+                logger.warning(f"MongoDB index {name} has different keys, run ensure_mongo_indexes --prune")
+                continue
+            collection.drop_index(name)
+            dropped.append(name)
+        try:
+            collection.create_index(keys, name=name, **options)
+            created.append(name)
+        except Exception as e:
+            logger.error(f"Error creating MongoDB index {name}: {e}")
+
+    if prune:
+        declared = {name for name, _, _ in INVENTORY_INDEXES} | {'_id_'}
+        for name in existing:
+            if name not in declared:
+                collection.drop_index(name)
+                dropped.append(name)
+
+    return created, dropped
+
+
 def get_inventory_collection():
     """Get inventory collection from MongoDB"""
     _, db = get_mongo_client()
     return db['inventory']
 
 
+def get_sync_metadata():
+    """
+    Leer el estado de la última sincronización (marca de agua de updated_at
+    y nombres de categoría proyectados). Devuelve {} si nunca se sincronizó.
+    """
+    _, db = get_mongo_client()
+    return db['sync_metadata'].find_one({'_id': 'inventory'}) or {}
+
+
+def save_sync_metadata(watermark, categories):
+    """Guardar la marca de agua y el mapa {id de categoría: nombre} proyectado"""
+    _, db = get_mongo_client()
+    db['sync_metadata'].replace_one(
+        {'_id': 'inventory'},
+        {
+            '_id': 'inventory',
+            'watermark': watermark,
+            'categories': {str(cat_id): name for cat_id, name in categories.items()},
+        },
+        upsert=True
+    )
+
+
+def sync_category_names(categories, previous):
+    """
+    Propagar renombres de categoría a todos los documentos afectados.
+    `categories` y `previous` son mapas {id: nombre}; devuelve las
+    categorías actualizadas y los documentos modificados.
+    """
+    collection = get_inventory_collection()
+    renamed = 0
+    modified = 0
+    for cat_id, name in categories.items():
+        old_name = previous.get(str(cat_id))
+        if old_name is None or old_name == name:
+            continue
+        result = collection.update_many(
+            {'category.id': cat_id},
+            {'$set': {'category.name': name}}
+        )
+        get_stats_collection().update_one(
+            {'_id': STATS_ID},
+            {'$set': {f'categories.{cat_id}.name': name}}
+        )
+        renamed += 1
+        modified += result.modified_count
+        logger.info(f"Renamed category {cat_id} in MongoDB: {old_name} -> {name}")
+    if renamed:
+        bump_cache_version()
+    return renamed, modified
+
+
+def sku_bucket(sku):
+    """Bucket de versión de un SKU (los SKUs comparten INVENTORY_CACHE_SKU_BUCKETS contadores)"""
+    return str(zlib.crc32(sku.encode('utf-8')) % settings.INVENTORY_CACHE_SKU_BUCKETS)
+
+
+def _versions_from_doc(doc):
+    doc = doc or {}
+    return {
+        'epoch': doc.get('version', 0),
+        'families': doc.get('families', {}),
+        'skus': doc.get('skus', {}),
+    }
+
+
+def get_cache_versions(max_age=0):
+    """
+    Versiones de datos del read model: {'epoch', 'families', 'skus'}.
+    Forman parte de las claves (época y familias) y de la validación de
+    cada entrada (buckets de sus SKUs). Se releen de MongoDB si tienen más
+    de `max_age` segundos en este proceso.
+    """
+    global _cache_versions
+    versions, read_at = _cache_versions
+    if versions is not None and time.time() - read_at < max_age:
+        return versions
+    _, db = get_mongo_client()
+    versions = _versions_from_doc(db['sync_metadata'].find_one({'_id': CACHE_VERSION_ID}))
+    _cache_versions = (versions, time.time())
+    return versions
+
+
+def get_cache_version(max_age=0):
+    """Época de los datos: solo cambia con escrituras masivas (resync, renombres)"""
+    return get_cache_versions(max_age)['epoch']
+
+
+def bump_cache_version(skus=None, families=CACHE_FAMILIES):
+    """
+    Invalidar lecturas cacheadas (de todos los procesos) tras una escritura.
+    Sin `skus` se incrementa la época y se invalida todo; con `skus` solo
+    las familias indicadas y los buckets de esos SKUs.
+    """
+    global _cache_versions
+    if skus is None:
+        inc = {'version': 1}
+    else:
+        inc = {f'families.{family}': 1 for family in families}
+        inc.update({f'skus.{bucket}': 1 for bucket in {sku_bucket(sku) for sku in skus}})
+        if not inc:
+            return
+    _, db = get_mongo_client()
+    doc = db['sync_metadata'].find_one_and_update(
+        {'_id': CACHE_VERSION_ID},
+        {'$inc': inc},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _cache_versions = (_versions_from_doc(doc), time.time())
+
+
+def changed_families(previous, document):
+    """Familias de lecturas afectadas al reemplazar `previous` por `document` (None: alta o baja)"""
+    if previous is None or document is None:
+        return set(CACHE_FAMILIES)
+    families = set()
+    fields = (previous.keys() | document.keys()) - {'_id'}
+    if any(previous.get(field) != document.get(field) for field in fields - STOCK_FIELDS):
+        families.add('catalog')
+    if previous.get('is_low_stock') != document.get('is_low_stock'):
+        families.add('low_stock')
+    if any(previous.get(field) != document.get(field) for field in STATS_PROJECTION):
+        families.add('stats')
+    return families
+
+
+def get_stats_collection():
+    """Colección con el documento de estadísticas materializadas"""
+    _, db = get_mongo_client()
+    return db['inventory_stats']
+
+
+def _stats_increments(documents, sign=1):
+    """Contribución ($inc) de un conjunto de documentos a las estadísticas"""
+    inc = {}
+
+    def add(field, value):
+        inc[field] = inc.get(field, 0) + sign * value
+
+    for doc in documents:
+        cat_id = doc['category']['id']
+        low = 1 if doc['stock_quantity'] < doc['min_stock_level'] else 0
+        value = doc['unit_price'] * doc['stock_quantity']
+        add('total_products', 1)
+        add('low_stock_items', low)
+        add('stock_value', value)
+        add(f'categories.{cat_id}.count', 1)
+        add(f'categories.{cat_id}.low_stock', low)
+        add(f'categories.{cat_id}.stock_value', value)
+    return inc
+
+
+def apply_stats_delta(old_documents, new_documents):
+    """
+    Actualizar las estadísticas con un solo $inc: resta la contribución de
+    los documentos anteriores y suma la de los nuevos
+    """
+    inc = _stats_increments(old_documents, sign=-1)
+    for field, value in _stats_increments(new_documents).items():
+        inc[field] = inc.get(field, 0) + value
+    inc = {field: value for field, value in inc.items() if value}
+    names = {f"categories.{doc['category']['id']}.name": doc['category']['name'] for doc in new_documents}
+
+    update = {}
+    if inc:
+        update['$inc'] = inc
+    if names:
+        update['$set'] = names
+    if update:
+        get_stats_collection().update_one({'_id': STATS_ID}, update, upsert=True)
+
+
+def mark_stats_stale():
+    """Marcar las estadísticas para recalcularlas (p.ej. tras escrituras fallidas)"""
+    get_stats_collection().update_one({'_id': STATS_ID}, {'$set': {'stale': True}}, upsert=True)
+
+
+def rebuild_inventory_stats():
+    """Recalcular las estadísticas completas con una agregación sobre el read model"""
+    pipeline = [
+        {'$group': {
+            '_id': '$category.id',
+            'name': {'$first': '$category.name'},
+            'count': {'$sum': 1},
+            'low_stock': {'$sum': {'$cond': [{'$lt': ['$stock_quantity', '$min_stock_level']}, 1, 0]}},
+            'stock_value': {'$sum': {'$multiply': ['$unit_price', '$stock_quantity']}},
+        }},
+    ]
+    categories = {}
+    for row in get_inventory_collection().aggregate(pipeline):
+        categories[str(row['_id'])] = {
+            'name': row['name'],
+            'count': row['count'],
+            'low_stock': row['low_stock'],
+            'stock_value': row['stock_value'],
+        }
+
+    stats = {
+        '_id': STATS_ID,
+        'total_products': sum(c['count'] for c in categories.values()),
+        'low_stock_items': sum(c['low_stock'] for c in categories.values()),
+        'stock_value': sum(c['stock_value'] for c in categories.values()),
+        'categories': categories,
+        'stale': False,
+    }
+    get_stats_collection().replace_one({'_id': STATS_ID}, stats, upsert=True)
+    bump_cache_version([], families=('stats',))
+    logger.info(f"Rebuilt inventory stats: {stats['total_products']} products")
+    return stats
+
+
+def get_inventory_stats():
+    """Leer las estadísticas materializadas (O(1)); se recalculan si faltan o están marcadas"""
+    stats = get_stats_collection().find_one({'_id': STATS_ID})
+    if stats is None or stats.get('stale'):
+        stats = rebuild_inventory_stats()
+    return stats
+
+
+def build_product_document(product):
+    """Crear documento desnormalizado para lectura rápida"""
+    return {
+        '_id': product.sku,
+        'sku': product.sku,
+        'name': product.name,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        },
+        'unit_price': float(product.unit_price),
+        'stock_quantity': product.stock_quantity,
+        'min_stock_level': product.min_stock_level,
+        'is_low_stock': product.stock_quantity < product.min_stock_level,
+        'supplier': product.supplier,
+        'search_tokens': search_tokens(product.name, product.sku),
+        'created_at': product.created_at.isoformat(),
+        'updated_at': product.updated_at.isoformat(),
+    }
+
+
 def sync_product_to_mongodb(product):
     """
     Sincroniza un producto desde PostgreSQL (Write Model) a MongoDB (Read Model)
@@ -47,30 +384,16 @@ def sync_product_to_mongodb(product):
     try:
         collection = get_inventory_collection()
         
-        # Crear documento desnormalizado para lectura rápida
-        document = {
-            '_id': product.sku,
-            'sku': product.sku,
-            'name': product.name,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            },
-            'unit_price': float(product.unit_price),
-            'stock_quantity': product.stock_quantity,
-            'min_stock_level': product.min_stock_level,
-            'supplier': product.supplier,
-            'created_at': product.created_at.isoformat(),
-            'updated_at': product.updated_at.isoformat(),
-        }
+        document = build_product_document(product)
         
-        # Upsert en MongoDB
-        collection.replace_one(
+        # Upsert en MongoDB (devuelve el documento anterior para las estadísticas y la caché)
+        previous = collection.find_one_and_replace(
             {'_id': product.sku},
             document,
             upsert=True
         )
+        apply_stats_delta([previous] if previous else [], [document])
+        bump_cache_version([product.sku], changed_families(previous, document))
         
         logger.info(f"Synced product {product.sku} to MongoDB")
         return True
@@ -78,3 +401,139 @@ def sync_product_to_mongodb(product):
         logger.error(f"Error syncing product {product.sku} to MongoDB: {e}")
         return False
 
+
+def _write_batch(collection, operations):
+    """Ejecutar un lote de upserts sin orden. Devuelve (sincronizados, fallidos)"""
+    try:
+        collection.bulk_write(operations, ordered=False)
+        return len(operations), 0
+    except BulkWriteError as e:
+        failed = len(e.details.get('writeErrors', []))
+        logger.error(f"Bulk write to MongoDB had {failed} errors")
+        return len(operations) - failed, failed
+    except Exception as e:
+        logger.error(f"Error in bulk write to MongoDB: {e}")
+        return 0, len(operations)
+
+
+def _stats_filter(previous):
+    """Filtro que solo coincide si el documento conserva los campos de estadísticas leídos"""
+    return {
+        '_id': previous['_id'],
+        'category.id': previous.get('category', {}).get('id'),
+        'unit_price': previous.get('unit_price'),
+        'stock_quantity': previous.get('stock_quantity'),
+        'min_stock_level': previous.get('min_stock_level'),
+    }
+
+
+def _write_batch_tracked(collection, documents, attempts=3):
+    """
+    Escribir un lote ajustando las estadísticas solo con los documentos que
+    reemplazaron exactamente la versión leída (compare-and-swap).
+
+    Cada reemplazo filtra por los campos de estadísticas del documento
+    anterior (upsert) y cada documento nuevo es un InsertOne: si otro
+    escritor (relay en paralelo, sync) cambió el documento entre la lectura
+    y la escritura, la operación falla con clave duplicada y ese documento
+    se vuelve a leer y escribir. Si el conflicto persiste, o hay otros
+    errores, las estadísticas se marcan para recalcularse.
+    Devuelve (sincronizados, fallidos, familias de lecturas afectadas).
+    """
+    synced = failed = 0
+    families = set()
+    pending = documents
+    for _ in range(attempts):
+        previous = {
+            doc['_id']: doc
+            for doc in collection.find({'_id': {'$in': [doc['_id'] for doc in pending]}})
+        }
+        operations = [
+            ReplaceOne(_stats_filter(previous[doc['_id']]), doc, upsert=True)
+            if doc['_id'] in previous else InsertOne(doc)
+            for doc in pending
+        ]
+        errors = []
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+        except Exception as e:
+            logger.error(f"Error in bulk write to MongoDB: {e}")
+            mark_stats_stale()
+            return synced, failed + len(pending), set(CACHE_FAMILIES)
+
+        conflicts = {error['index'] for error in errors if error.get('code') == DUPLICATE_KEY_ERROR}
+        errored = {error['index'] for error in errors} - conflicts
+        applied = [doc for index, doc in enumerate(pending) if index not in conflicts and index not in errored]
+        apply_stats_delta([previous[doc['_id']] for doc in applied if doc['_id'] in previous], applied)
+        for doc in applied:
+            families |= changed_families(previous.get(doc['_id']), doc)
+        synced += len(applied)
+        if errored:
+            logger.error(f"Bulk write to MongoDB had {len(errored)} errors")
+            mark_stats_stale()
+            families.update(CACHE_FAMILIES)
+            failed += len(errored)
+
+        pending = [doc for index, doc in enumerate(pending) if index in conflicts]
+        if not pending:
+            return synced, failed, families
+
+    # Documentos disputados en todos los intentos: se escriben sin comparar
+    logger.warning(f"{len(pending)} documents kept changing concurrently, marking stats stale")
+    ok, ko = _write_batch(collection, [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in pending])
+    mark_stats_stale()
+    return synced + ok, failed + ko, set(CACHE_FAMILIES)
+
+
+def bulk_sync_products(products, batch_size=1000, on_batch=None, track_stats=True):
+    """
+    Sincroniza un iterable de productos a MongoDB con bulk_write desordenado.
+
+    Los documentos se construyen y escriben en lotes de batch_size
+    (un round trip por lote). Si se pasa on_batch se invoca después de
+    cada lote con (procesados, sincronizados, fallidos) acumulados.
+    Con track_stats las estadísticas materializadas se ajustan por lote
+    con un $inc calculado contra la versión que cada escritura reemplazó
+    (_write_batch_tracked) y la caché de lecturas se invalida solo en las
+    familias y SKUs afectados; las resincronizaciones completas lo
+    desactivan (incrementan la época de la caché) y llaman a
+    rebuild_inventory_stats() al final.
+    Devuelve (sincronizados, fallidos).
+    """
+    collection = get_inventory_collection()
+    processed = synced = failed = 0
+    documents = []
+
+    def flush():
+        nonlocal synced, failed
+        if track_stats:
+            ok, ko, families = _write_batch_tracked(collection, documents)
+            if ok or ko:
+                bump_cache_version([doc['_id'] for doc in documents], families)
+        else:
+            operations = [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in documents]
+            ok, ko = _write_batch(collection, operations)
+            if ok:
+                bump_cache_version()
+        synced += ok
+        failed += ko
+        documents.clear()
+        if on_batch:
+            on_batch(processed, synced, failed)
+
+    for product in products:
+        processed += 1
+        try:
+            documents.append(build_product_document(product))
+        except Exception as e:
+            logger.error(f"Error building MongoDB document for {product.sku}: {e}")
+            failed += 1
+        if len(documents) >= batch_size:
+            flush()
+
+    if documents:
+        flush()
+
+    return synced, failed
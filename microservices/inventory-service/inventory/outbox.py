@@ -0,0 +1,121 @@
+"""
+Transactional outbox: propagación Write Model (PostgreSQL) -> Read Model (MongoDB)
+
+Los cambios de productos registran un OutboxEvent en la misma transacción
+de PostgreSQL. El relay (manage.py relay_outbox) drena la tabla en lotes y
+aplica upserts coalescidos en MongoDB, fuera del camino de escritura.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Product, InventoryTransaction, OutboxEvent
+from .mongodb_client import (
+    STATS_PROJECTION, apply_stats_delta, bulk_sync_products, bump_cache_version,
+    get_inventory_collection
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_product_changes(skus):
+    """
+    Registrar en el outbox los SKUs modificados.
+    Debe llamarse dentro de la transacción que modifica los productos.
+    """
+    OutboxEvent.objects.bulk_create([OutboxEvent(sku=sku) for sku in skus])
+
+
+def save_product(product):
+    """Guardar un producto y registrar su cambio en el outbox (misma transacción)"""
+    with transaction.atomic():
+        product.save()
+        enqueue_product_changes([product.sku])
+    return product
+
+
+def record_stock_transaction(product, transaction_type, quantity, new_stock, notes=''):
+    """
+    Registrar una InventoryTransaction, actualizar el stock y el contador de
+    transacciones del producto y encolar el cambio en el outbox, todo en una
+    sola transacción.
+
+    El cambio (new_stock - stock conocido por el llamador) se aplica sobre
+    el stock actual de la fila bloqueada, de modo que dos llamadas
+    concurrentes no pisan el descuento de la otra (el stock no baja de 0).
+    """
+    with transaction.atomic():
+        current = (
+            Product.objects.select_for_update()
+            .values_list('stock_quantity', flat=True)
+            .get(pk=product.pk)
+        )
+        new_stock = max(0, current + new_stock - product.stock_quantity)
+        product.stock_quantity = current
+        inventory_transaction = InventoryTransaction.objects.create(
+            product=product,
+            transaction_type=transaction_type,
+            quantity=quantity,
+            previous_stock=current,
+            new_stock=new_stock,
+            notes=notes
+        )
+        now = timezone.now()
+        Product.objects.filter(pk=product.pk).update(
+            stock_quantity=new_stock,
+            transaction_count=F('transaction_count') + 1,
+            updated_at=now
+        )
+        product.stock_quantity = new_stock
+        product.transaction_count += 1
+        product.updated_at = now
+        enqueue_product_changes([product.sku])
+    return inventory_transaction
+
+
+def relay_batch(batch_size=1000):
+    """
+    Drenar un lote del outbox y aplicarlo en MongoDB.
+
+    Los eventos del mismo SKU se coalescen en un único upsert; los SKUs que
+    ya no existen en PostgreSQL se eliminan del read model. Si algún upsert
+    falla, la transacción se revierte y el lote se reintenta en la siguiente
+    ejecución. Devuelve (eventos, skus, lag_ms) del lote procesado.
+    """
+    with transaction.atomic():
+        # skip_locked permite varios relays en paralelo sin bloquearse
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0, 0, 0
+
+        skus = {event.sku for event in events}
+        products = list(Product.objects.select_related('category').filter(sku__in=skus))
+
+        synced, failed = bulk_sync_products(products, batch_size=len(skus))
+        if failed:
+            logger.error(f"Outbox relay: {failed} products failed, batch will be retried")
+            transaction.set_rollback(True)
+            return 0, 0, 0
+
+        missing = skus - {product.sku for product in products}
+        if missing:
+            collection = get_inventory_collection()
+            # El documento eliminado lo devuelve el propio borrado: otro relay
+            # que borre el mismo SKU no lo resta dos veces de las estadísticas
+            removed = [
+                doc for doc in (
+                    collection.find_one_and_delete({'_id': sku}, projection=STATS_PROJECTION)
+                    for sku in missing
+                ) if doc is not None
+            ]
+            apply_stats_delta(removed, [])
+            bump_cache_version(list(missing))
+
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+
+    oldest = min(event.created_at for event in events)
+    lag = (timezone.now() - oldest).total_seconds() * 1000
+    return len(events), len(skus), lag
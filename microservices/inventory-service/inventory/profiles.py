@@ -0,0 +1,109 @@
+"""
+Perfiles de respuesta y proyección de campos del inventario
+
+Un perfil (?profile=) o una lista explícita (?fields=) define qué campos se
+devuelven. Se traduce a una proyección de MongoDB (Read Model) y a la lista
+de columnas del SELECT de PostgreSQL (Write Model).
+"""
+
+# Campos disponibles en los documentos del read model
+MONGO_FIELDS = [
+    'sku', 'name', 'description', 'category', 'unit_price', 'stock_quantity',
+    'min_stock_level', 'is_low_stock', 'supplier', 'created_at', 'updated_at',
+]
+
+# Campo lógico -> expresiones SELECT de la consulta SQL (en orden)
+SQL_FIELD_COLUMNS = {
+    'sku': ['p.sku'],
+    'name': ['p.name'],
+    'description': ['p.description'],
+    'unit_price': ['p.unit_price'],
+    'stock_quantity': ['p.stock_quantity'],
+    'min_stock_level': ['p.min_stock_level'],
+    'supplier': ['p.supplier'],
+    'category': ['c.name as category_name', 'c.description as category_description'],
+    'transaction_count': ['COUNT(it.id) as transaction_count'],
+}
+
+# Perfiles con nombre. None = todos los campos
+PROFILES = {
+    'summary': ['sku', 'name', 'category', 'unit_price', 'stock_quantity'],
+    'full': None,
+}
+
+DEFAULT_PROFILE = 'full'
+
+
+def resolve_fields(params, available):
+    """
+    Obtener la lista de campos pedida en ?fields= o ?profile=.
+    Devuelve None si se piden todos los campos; lanza ValueError si
+    el perfil o algún campo no existe.
+    """
+    fields = params.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in available]
+        if unknown:
+            raise ValueError(f'Unknown fields: {unknown}. Must be in: {list(available)}')
+        return fields
+
+    profile = params.get('profile', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f'Invalid profile. Must be one of: {list(PROFILES.keys())}')
+    if PROFILES[profile] is None:
+        return None
+    return [f for f in PROFILES[profile] if f in available]
+
+
+# Campos internos del read model que no se devuelven (índices de búsqueda)
+MONGO_INTERNAL_FIELDS = ['search_tokens']
+
+
+def mongo_projection(fields):
+    """
+    Proyección de MongoDB para los campos pedidos.
+    _id y name se incluyen siempre porque son la clave de la paginación keyset.
+    Sin campos explícitos se excluyen solo los campos internos.
+    """
+    if fields is None:
+        return {field: 0 for field in MONGO_INTERNAL_FIELDS}
+    projection = {'_id': 1, 'name': 1}
+    for field in fields:
+        projection[field] = 1
+    return projection
+
+
+# Modos de la consulta SQL: 'legacy' cuenta las transacciones con JOIN + GROUP BY,
+# 'optimized' lee el contador products.transaction_count
+SQL_MODES = ['legacy', 'optimized']
+
+
+def sql_select(fields, mode='legacy'):
+    """
+    Construir (columnas, joins, group_by) para la consulta de productos.
+    Los JOIN y el GROUP BY solo se incluyen si algún campo los necesita.
+    """
+    if fields is None:
+        fields = list(SQL_FIELD_COLUMNS.keys())
+
+    columns = ['p.id']
+    for field in fields:
+        if field == 'transaction_count' and mode == 'optimized':
+            columns.append('p.transaction_count')
+            continue
+        columns.extend(SQL_FIELD_COLUMNS[field])
+
+    joins = []
+    if 'category' in fields:
+        joins.append('INNER JOIN product_categories c ON p.category_id = c.id')
+
+    group_by = []
+    if 'transaction_count' in fields and mode == 'legacy':
+        joins.append('LEFT JOIN inventory_transactions it ON p.id = it.product_id')
+        # Las columnas de p dependen funcionalmente de p.id (PK)
+        group_by = ['p.id']
+        if 'category' in fields:
+            group_by.extend(['c.name', 'c.description'])
+
+    return columns, joins, group_by
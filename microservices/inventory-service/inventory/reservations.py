@@ -0,0 +1,196 @@
+"""
+Reserva atómica de stock para pedidos
+
+Todas las líneas se descuentan en una sola transacción con un UPDATE
+condicional (stock_quantity >= cantidad): si alguna no alcanza, no se
+reserva ninguna. Las filas se bloquean en orden de id para que dos reservas
+con SKUs en común no se bloqueen mutuamente, y la transacción no hace I/O
+a MongoDB (el cambio viaja por el outbox), así que los bloqueos sobre los
+SKUs populares duran solo lo que tardan los INSERT.
+
+Cada reserva queda registrada por su referencia (StockReservation) en la
+misma transacción: reintentar una reserva con la misma referencia (p.ej.
+tras un timeout) devuelve la ya aplicada sin descontar otra vez, y la
+devolución solo acepta una reserva activa y repone exactamente lo reservado.
+"""
+from collections import OrderedDict
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from .models import Product, InventoryTransaction, StockReservation
+from .outbox import enqueue_product_changes
+
+
+class ReservationError(Exception):
+    """La reserva no se aplicó: SKUs desconocidos o sin stock suficiente"""
+
+    def __init__(self, unknown, insufficient):
+        self.unknown = unknown
+        self.insufficient = insufficient
+        super().__init__(f"unknown={unknown} insufficient={insufficient}")
+
+
+class ReservationConflict(Exception):
+    """
+    La referencia no admite la operación: ya se usó con otras líneas, no
+    está activa o no existe (status 'UNKNOWN')
+    """
+
+    def __init__(self, reference, status):
+        self.reference = reference
+        self.status = status
+        super().__init__(f"reservation {reference} is {status}")
+
+
+def normalize_items(items):
+    """
+    Agrupar las líneas por SKU: [{'sku', 'quantity'}] -> {sku: cantidad}.
+    Lanza ValueError si alguna línea es inválida.
+    """
+    quantities = OrderedDict()
+    for item in items:
+        sku = item.get('sku') if isinstance(item, dict) else None
+        quantity = item.get('quantity') if isinstance(item, dict) else None
+        if not isinstance(sku, str) or not sku:
+            raise ValueError('Each item needs a sku')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise ValueError(f'Invalid quantity for {sku}')
+        quantities[sku] = quantities.get(sku, 0) + quantity
+    return quantities
+
+
+_STOCK_SQL = """
+    WITH req(sku, quantity) AS (VALUES {values}),
+    locked AS (
+        SELECT p.id, req.quantity
+        FROM products p
+        JOIN req ON p.sku = req.sku
+        ORDER BY p.id
+        FOR UPDATE OF p
+    )
+    UPDATE products AS p
+    SET stock_quantity = p.stock_quantity {op} locked.quantity,
+        transaction_count = p.transaction_count + 1,
+        updated_at = %s
+    FROM locked
+    WHERE p.id = locked.id {condition}
+    RETURNING p.id, p.sku, p.stock_quantity
+"""
+
+
+def _set_lock_timeout():
+    """Fallar rápido en lugar de encolarse detrás de un SKU o referencia muy disputados"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SET LOCAL lock_timeout = %s",
+            [f"{settings.INVENTORY_RESERVATION_LOCK_TIMEOUT_MS}ms"]
+        )
+
+
+def _apply_stock_changes(quantities, transaction_type, notes, release=False):
+    """
+    Aplicar {sku: cantidad} (descuento condicional o devolución) con un solo
+    UPDATE, registrar las InventoryTransaction en bloque y encolar el outbox.
+    Debe llamarse dentro de la transacción de la reserva.
+    """
+    now = timezone.now()
+    values = ', '.join(['(%s, %s)'] * len(quantities))
+    params = [value for sku, quantity in quantities.items() for value in (sku, quantity)]
+    sql = _STOCK_SQL.format(
+        values=values,
+        op='+' if release else '-',
+        condition='' if release else 'AND p.stock_quantity >= locked.quantity',
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [now])
+            updated = {sku: (product_id, stock) for product_id, sku, stock in cursor.fetchall()}
+
+        if len(updated) < len(quantities):
+            failed = [sku for sku in quantities if sku not in updated]
+            existing = set(Product.objects.filter(sku__in=failed).values_list('sku', flat=True))
+            # La excepción revierte los cambios ya aplicados
+            raise ReservationError(
+                unknown=[sku for sku in failed if sku not in existing],
+                insufficient=[sku for sku in failed if sku in existing],
+            )
+
+        sign = 1 if release else -1
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                product_id=updated[sku][0],
+                transaction_type=transaction_type,
+                quantity=quantity,
+                previous_stock=updated[sku][1] - sign * quantity,
+                new_stock=updated[sku][1],
+                notes=notes,
+            )
+            for sku, quantity in quantities.items()
+        ])
+        # El relay del outbox propaga el stock nuevo a MongoDB
+        enqueue_product_changes(list(quantities))
+
+    return [(sku, quantity, updated[sku][1]) for sku, quantity in quantities.items()]
+
+
+def _current_stock(quantities):
+    """[(sku, cantidad, stock actual)] para responder una reserva ya aplicada"""
+    stock = dict(Product.objects.filter(sku__in=list(quantities)).values_list('sku', 'stock_quantity'))
+    return [(sku, quantity, stock.get(sku)) for sku, quantity in quantities.items()]
+
+
+def reserve_stock(quantities, reference):
+    """
+    Descontar {sku: cantidad} en una sola transacción, registrar una
+    InventoryTransaction 'OUT' por SKU y la reserva de `reference`.
+    Devuelve ([(sku, cantidad, stock)], creada). Si la referencia ya tiene
+    una reserva activa con las mismas líneas no descuenta de nuevo (creada
+    = False). Lanza ReservationError si algún SKU no existe o no tiene stock
+    y ReservationConflict si la referencia se usó con otras líneas o ya no
+    está activa.
+    """
+    items = [{'sku': sku, 'quantity': quantity} for sku, quantity in quantities.items()]
+    with transaction.atomic():
+        _set_lock_timeout()
+        try:
+            # Si otra petición con la misma referencia está en curso, el INSERT
+            # espera a que termine y falla por unicidad si llegó a confirmarse
+            with transaction.atomic():
+                StockReservation.objects.create(reference=reference, items=items)
+        except IntegrityError:
+            existing = StockReservation.objects.get(reference=reference)
+            if existing.status != 'ACTIVE':
+                raise ReservationConflict(reference, existing.status)
+            if existing.quantities() != dict(quantities):
+                raise ReservationConflict(reference, 'MISMATCH')
+            return _current_stock(existing.quantities()), False
+        # ReservationError revierte también el registro de la reserva
+        changed = _apply_stock_changes(quantities, 'OUT', f"Reserva {reference}")
+    return changed, True
+
+
+def release_reservation(reference):
+    """
+    Devolver al stock la reserva activa de `reference` (exactamente lo
+    reservado, una InventoryTransaction 'IN' por SKU) y marcarla liberada.
+    Devuelve [(sku, cantidad, stock nuevo)]. Lanza ReservationConflict si
+    no está activa o no existe; en ese caso la referencia queda cerrada para
+    que una reserva que llegue después con ella no se aplique.
+    """
+    with transaction.atomic():
+        _set_lock_timeout()
+        reservation, created = StockReservation.objects.select_for_update().get_or_create(
+            reference=reference,
+            defaults={'status': 'CANCELLED', 'released_at': timezone.now()},
+        )
+        if reservation.status == 'ACTIVE':
+            changed = _apply_stock_changes(
+                reservation.quantities(), 'IN', f"Liberación {reference}", release=True
+            )
+            reservation.status = 'RELEASED'
+            reservation.released_at = timezone.now()
+            reservation.save(update_fields=['status', 'released_at'])
+            return changed
+    # Fuera del bloque: el cierre de la referencia se confirma antes de rechazar
+    raise ReservationConflict(reference, 'UNKNOWN' if created else reservation.status)
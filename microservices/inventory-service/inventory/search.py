@@ -0,0 +1,53 @@
+"""
+Búsqueda de productos sobre el read model (MongoDB)
+
+- Texto completo: índice de texto sobre sku/name/description con pesos,
+  ordenado por relevancia (textScore).
+- Typeahead: prefijos sobre `search_tokens`, los tokens normalizados
+  (minúsculas, sin tildes) del nombre y del SKU, con índice multikey.
+"""
+import re
+import unicodedata
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+# Longitud mínima del prefijo para el typeahead (evita escanear medio índice)
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize(text):
+    """Minúsculas y sin tildes: 'Señal Advertencia' -> 'senal advertencia'"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    """Tokens normalizados de un texto"""
+    return [token for token in _TOKEN_SPLIT.split(normalize(text)) if token]
+
+
+def search_tokens(name, sku):
+    """Tokens del nombre y del SKU (partes y SKU completo) sin repetidos"""
+    tokens = tokenize(name) + tokenize(sku) + [normalize(sku)]
+    return list(dict.fromkeys(tokens))
+
+
+def prefix_query(q):
+    """
+    Filtro Mongo para el typeahead: cada palabra de `q` debe ser prefijo de
+    algún token. Los regex anclados (^) y sensibles a mayúsculas usan el índice.
+    Lanza ValueError si no hay un prefijo de longitud suficiente.
+    """
+    words = [word for word in normalize(q).split() if word]
+    prefixes = []
+    for word in words:
+        if '-' in word:
+            # SKU parcial: se compara contra el SKU completo normalizado
+            prefixes.append(word)
+        else:
+            prefixes.extend(tokenize(word))
+    if not prefixes or max(len(p) for p in prefixes) < MIN_PREFIX_LENGTH:
+        raise ValueError(f'q must contain at least {MIN_PREFIX_LENGTH} characters')
+    # El prefijo más largo primero: es el más selectivo para el índice
+    prefixes.sort(key=len, reverse=True)
+    return {'search_tokens': {'$all': [re.compile('^' + re.escape(p)) for p in prefixes]}}
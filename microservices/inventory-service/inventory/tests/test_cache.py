@@ -0,0 +1,168 @@
+"""
+Pruebas de la caché de lecturas: familias, invalidación por SKU y límite en bytes
+"""
+import threading
+from unittest import mock
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from inventory import cache
+from inventory.cache import LRUCache, ReadThroughCache
+from inventory.mongodb_client import changed_families, sku_bucket
+
+
+class FakeVersions:
+    """Sustituto de get_cache_versions con contadores en memoria"""
+
+    def __init__(self):
+        self.versions = {'epoch': 0, 'families': {}, 'skus': {}}
+
+    def __call__(self, max_age=0):
+        return {
+            'epoch': self.versions['epoch'],
+            'families': dict(self.versions['families']),
+            'skus': dict(self.versions['skus']),
+        }
+
+    def bump(self, skus=(), families=()):
+        for family in families:
+            self.versions['families'][family] = self.versions['families'].get(family, 0) + 1
+        for sku in skus:
+            bucket = sku_bucket(sku)
+            self.versions['skus'][bucket] = self.versions['skus'].get(bucket, 0) + 1
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        lru = LRUCache(max_size=100, ttl=60, max_bytes=3000, sizeof=len)
+        lru.set('a', 'x' * 1000)
+        lru.set('b', 'x' * 1000)
+        lru.get('a')
+        lru.set('c', 'x' * 1500)
+        self.assertIsNone(lru.get('b'))
+        self.assertIsNotNone(lru.get('a'))
+        self.assertEqual(lru.bytes, 2500)
+
+    def test_skips_values_larger_than_limit(self):
+        lru = LRUCache(max_size=100, ttl=60, max_bytes=100, sizeof=len)
+        lru.set('big', 'x' * 101)
+        self.assertIsNone(lru.get('big'))
+        self.assertEqual((lru.bytes, lru.oversized), (0, 1))
+
+    def test_replacing_a_key_updates_size(self):
+        lru = LRUCache(max_size=100, ttl=60, max_bytes=1000, sizeof=len)
+        lru.set('a', 'x' * 600)
+        lru.set('a', 'x' * 100)
+        self.assertEqual(lru.bytes, 100)
+
+
+class ReadThroughCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.versions = FakeVersions()
+        patcher = mock.patch.object(cache, 'get_cache_versions', self.versions)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ReadThroughCache(max_size=100, ttl=60, max_bytes=1024 * 1024)
+        self.loads = 0
+
+    def loader(self, value, skus=None):
+        def load():
+            self.loads += 1
+            return value, skus
+        return load
+
+    def test_hit_after_miss(self):
+        load = self.loader('page', ['A', 'B'])
+        self.assertEqual(self.cache.get_or_load('list', {'limit': 5}, load), ('page', 'miss'))
+        self.assertEqual(self.cache.get_or_load('list', {'limit': 5}, load), ('page', 'local'))
+        self.assertEqual(self.loads, 1)
+
+    def test_stock_change_only_invalidates_entries_with_that_sku(self):
+        self.cache.get_or_load('list', {'page': 1}, self.loader('p1', ['A', 'B']))
+        self.cache.get_or_load('list', {'page': 2}, self.loader('p2', ['C', 'D']))
+        self.cache.get_or_load('names', {}, self.loader('names', None))
+        # Un bucket distinto de los de la página 2
+        other = next(f'X{i}' for i in range(1000) if sku_bucket(f'X{i}') not in {sku_bucket('C'), sku_bucket('D')})
+        self.versions.bump(skus=['A', other], families=['stats'])
+
+        self.assertEqual(self.cache.get_or_load('list', {'page': 1}, self.loader('p1'))[1], 'miss')
+        self.assertEqual(self.cache.get_or_load('list', {'page': 2}, self.loader('p2'))[1], 'local')
+        self.assertEqual(self.cache.get_or_load('names', {}, self.loader('names'))[1], 'local')
+
+    def test_family_change_invalidates_dependent_reads(self):
+        self.cache.get_or_load('low_stock', {}, self.loader('low'), families=('catalog', 'low_stock'))
+        self.cache.get_or_load('list', {}, self.loader('list'), families=('catalog',))
+        self.versions.bump(families=['low_stock'])
+        self.assertEqual(self.cache.get_or_load('low_stock', {}, self.loader('low'),
+                                                families=('catalog', 'low_stock'))[1], 'miss')
+        self.assertEqual(self.cache.get_or_load('list', {}, self.loader('list'))[1], 'local')
+
+    def test_epoch_change_invalidates_everything(self):
+        self.cache.get_or_load('product', {'sku': 'A'}, self.loader('A', ['A']), families=())
+        self.versions.versions['epoch'] += 1
+        self.assertEqual(self.cache.get_or_load('product', {'sku': 'A'}, self.loader('A', ['A']),
+                                                families=())[1], 'miss')
+
+    def test_concurrent_misses_run_loader_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_load():
+            self.loads += 1
+            started.set()
+            release.wait(5)
+            return 'value', None
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(self.cache.get_or_load('k', {}, slow_load)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(self.cache.get_or_load('k', {}, slow_load)))
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(sorted(source for _, source in results), ['coalesced', 'miss'])
+
+    def test_shared_tier_serves_other_processes_and_checks_skus(self):
+        shared = LocMemCache('inventory-tests', {})
+        self.addCleanup(shared.clear)
+        other = ReadThroughCache(max_size=100, ttl=60, shared=shared)
+        self.cache.shared = shared
+
+        self.cache.get_or_load('list', {}, self.loader('page', ['A']))
+        self.assertEqual(other.get_or_load('list', {}, self.loader('page'))[1], 'shared')
+
+        self.versions.bump(skus=['A'])
+        other.clear()
+        self.assertEqual(other.get_or_load('list', {}, self.loader('page', ['A']))[1], 'miss')
+
+
+class ChangedFamiliesTests(SimpleTestCase):
+
+    def document(self, **changes):
+        doc = {
+            '_id': 'A', 'sku': 'A', 'name': 'Guantes', 'category': {'id': 1, 'name': 'EPP'},
+            'unit_price': 10.0, 'stock_quantity': 50, 'min_stock_level': 10, 'is_low_stock': False,
+            'updated_at': '2024-01-01T00:00:00',
+        }
+        doc.update(changes)
+        return doc
+
+    def test_stock_change(self):
+        families = changed_families(self.document(), self.document(stock_quantity=40, updated_at='x'))
+        self.assertEqual(families, {'stats'})
+
+    def test_stock_change_crossing_minimum(self):
+        families = changed_families(self.document(), self.document(stock_quantity=5, is_low_stock=True))
+        self.assertEqual(families, {'stats', 'low_stock'})
+
+    def test_catalog_change(self):
+        self.assertEqual(changed_families(self.document(), self.document(name='Botas')), {'catalog'})
+
+    def test_insert_and_delete(self):
+        self.assertEqual(changed_families(None, self.document()), {'catalog', 'low_stock', 'stats'})
+        self.assertEqual(changed_families(self.document(), None), {'catalog', 'low_stock', 'stats'})
@@ -0,0 +1,24 @@
+"""
+Pruebas de validación del lookup de productos por SKU
+"""
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+from inventory import views
+
+
+class ProductsLookupValidationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def post(self, body):
+        return views.products_lookup(self.factory.post('/inventory/products/lookup', body, format='json'))
+
+    def test_rejects_non_object_body(self):
+        response = self.post(['A', 'B'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'body must be a JSON object')
+
+    def test_rejects_invalid_skus(self):
+        for body in [{}, {'skus': 'A'}, {'skus': ['A', None]}]:
+            self.assertEqual(self.post(body).status_code, 400, body)
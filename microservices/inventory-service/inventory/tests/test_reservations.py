@@ -0,0 +1,53 @@
+"""
+Pruebas de los endpoints de reserva: validación y respuestas por referencia
+"""
+from unittest import mock
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+from inventory import views
+from inventory.reservations import ReservationConflict, ReservationError
+
+
+class ReservationViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def post(self, view, body):
+        return view(self.factory.post('/reservations', body, format='json'))
+
+    def test_reserve_requires_reference(self):
+        response = self.post(views.reserve, {'items': [{'sku': 'A', 'quantity': 1}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_object_body_is_rejected(self):
+        for view in (views.reserve, views.release):
+            response = self.post(view, [{'sku': 'A', 'quantity': 1}])
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], 'body must be a JSON object')
+
+    def test_repeated_reserve_is_reported_as_existing(self):
+        with mock.patch.object(views, 'reserve_stock', return_value=([('A', 2, 8)], False)) as reserve:
+            response = self.post(views.reserve, {'items': [{'sku': 'A', 'quantity': 2}], 'reference': 'ORD-1'})
+        reserve.assert_called_once_with({'A': 2}, 'ORD-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['created'])
+
+    def test_reserve_rejections(self):
+        body = {'items': [{'sku': 'A', 'quantity': 2}], 'reference': 'ORD-1'}
+        with mock.patch.object(views, 'reserve_stock', side_effect=ReservationError([], ['A'])):
+            response = self.post(views.reserve, body)
+        self.assertEqual((response.status_code, response.data['insufficient']), (409, ['A']))
+        with mock.patch.object(views, 'reserve_stock', side_effect=ReservationConflict('ORD-1', 'MISMATCH')):
+            self.assertEqual(self.post(views.reserve, body).status_code, 409)
+
+    def test_release_by_reference_only(self):
+        with mock.patch.object(views, 'release_reservation', return_value=[('A', 2, 10)]) as release:
+            response = self.post(views.release, {'reference': 'ORD-1', 'items': [{'sku': 'A', 'quantity': 99}]})
+        release.assert_called_once_with('ORD-1')
+        self.assertEqual(response.data['items'], [{'sku': 'A', 'quantity': 2, 'stock_quantity': 10}])
+
+    def test_release_of_unknown_or_inactive_reservation(self):
+        for state, expected in [('UNKNOWN', 404), ('RELEASED', 409), ('CANCELLED', 409)]:
+            with mock.patch.object(views, 'release_reservation', side_effect=ReservationConflict('ORD-1', state)):
+                self.assertEqual(self.post(views.release, {'reference': 'ORD-1'}).status_code, expected)
@@ -1,6 +1,7 @@
 """
 URLs for Inventory Service
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -8,6 +9,27 @@ urlpatterns = [
     path('health', views.health_check, name='health'),
     path('inventory/sql-list', views.sql_list, name='sql_list'),
     path('inventory/nosql-list', views.nosql_list, name='nosql_list'),
+    path('inventory/nosql-stream', views.nosql_stream, name='nosql_stream'),
+    path('inventory/low-stock', views.low_stock, name='low_stock'),
+    path('inventory/by-category/<int:category_id>', views.products_by_category, name='products_by_category'),
+    path('inventory/by-supplier', views.products_by_supplier, name='products_by_supplier'),
+    path('inventory/by-price', views.products_by_price, name='products_by_price'),
+    path('inventory/search', views.search_products, name='search_products'),
+    path('inventory/typeahead', views.typeahead, name='typeahead'),
+    path('inventory/products/lookup', views.products_lookup, name='products_lookup'),
+    path('inventory/products/<str:sku>', views.product_detail, name='product_detail'),
+    path('inventory/reservations', views.reserve, name='reserve'),
+    path('inventory/reservations/release', views.release, name='release'),
     path('inventory/stats', views.inventory_stats, name='inventory_stats'),
 ]
 
+if settings.INVENTORY_ASYNC_VIEWS:
+    from . import async_views
+
+    # Vistas asíncronas para el despliegue ASGI (uvicorn)
+    urlpatterns += [
+        path('async/health', async_views.health_check, name='async_health'),
+        path('async/inventory/nosql-list', async_views.nosql_list, name='async_nosql_list'),
+        path('async/inventory/stats', async_views.inventory_stats, name='async_inventory_stats'),
+    ]
+
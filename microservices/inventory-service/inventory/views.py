@@ -1,56 +1,130 @@
 """
 Views for Inventory Service
 """
+import json
 import time
+from decimal import Decimal
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import connection
-from .mongodb_client import get_inventory_collection
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from .cache import cached_read, get_read_cache
+from .mongodb_client import (
+    STOCK_FIELDS, get_cache_versions, get_inventory_collection, get_inventory_stats, sku_bucket
+)
+from .profiles import (
+    MONGO_FIELDS, SQL_FIELD_COLUMNS, SQL_MODES, mongo_projection, resolve_fields, sql_select
+)
+from .reservations import (
+    ReservationConflict, ReservationError, normalize_items, release_reservation, reserve_stock
+)
+from .search import prefix_query
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ResponseJSONEncoder(DjangoJSONEncoder):
+    """Como el renderer de DRF: los Decimal (p.ej. unit_price) se devuelven como números"""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
+
+
 @api_view(['GET'])
 def health_check(request):
     """Health check endpoint"""
     return Response({
         'status': 'ok',
-        'service': 'inventory-service'
+        'service': 'inventory-service',
+        'read_cache': get_read_cache().stats()
     })
 
 
+def _encode_data(results, meta):
+    """
+    Serializar 'data' midiendo el costo de codificación JSON.
+    Agrega encode_time_ms y response_bytes (tamaño de 'data') a meta.
+    """
+    encode_start = time.time()
+    data_json = json.dumps(results, cls=ResponseJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    meta['encode_time_ms'] = round((time.time() - encode_start) * 1000, 2)
+    meta['response_bytes'] = len(data_json.encode('utf-8'))
+    return data_json
+
+
+def _envelope_response(data_json, meta):
+    """Respuesta {"data": ..., **meta} con 'data' ya serializado"""
+    # Resto del envelope: se omite la '{' inicial para cerrar el objeto abierto
+    body = '{"data":' + data_json + ',' + json.dumps(meta, ensure_ascii=False, separators=(',', ':'))[1:]
+    return HttpResponse(body, content_type='application/json')
+
+
+def _encoded_response(results, meta):
+    """Serializar la respuesta midiendo el costo de codificación JSON"""
+    return _envelope_response(_encode_data(results, meta), meta)
+
+
+def _shows_stock(fields):
+    """Si la respuesta incluye campos que cambian con el stock (None: todos los campos)"""
+    return fields is None or any(field in STOCK_FIELDS for field in fields)
+
+
+def _cached_response(namespace, params, start_time, load, families=('catalog',), per_document=True):
+    """
+    Respuesta a través de la caché de lecturas. `load` devuelve
+    (results, meta); se cachea 'data' ya serializado junto con meta.
+    Con per_document la entrada se invalida cuando cambia alguno de los
+    documentos devueltos (p.ej. su stock), además de con `families`.
+    """
+    def loader():
+        results, meta = load()
+        skus = [item.get('_id', item.get('sku')) for item in results] if per_document else None
+        return (_encode_data(results, meta), meta), skus
+
+    (data_json, cached_meta), source = cached_read(namespace, params, loader, families)
+    meta = dict(cached_meta)
+    meta['elapsed_time_ms'] = round((time.time() - start_time) * 1000, 2)
+    meta['cache'] = source
+    return _envelope_response(data_json, meta)
+
+
 @api_view(['GET'])
 def sql_list(request):
     """
     Endpoint LENTO - Consulta compleja a PostgreSQL (Línea Base)
     Simula JOINs costosos para demostrar la diferencia con CQRS
+
+    Acepta ?profile= o ?fields= para limitar las columnas del SELECT y
+    ?mode=optimized|legacy (default: INVENTORY_SQL_MODE) para comparar la
+    consulta con contador contra el JOIN + GROUP BY original.
     """
     start_time = time.time()
     
     try:
+        mode = request.GET.get('mode', settings.INVENTORY_SQL_MODE)
+        try:
+            if mode not in SQL_MODES:
+                raise ValueError(f'Invalid mode. Must be one of: {SQL_MODES}')
+            fields = resolve_fields(request.GET, SQL_FIELD_COLUMNS)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        columns, joins, group_by = sql_select(fields, mode)
+
         with connection.cursor() as cursor:
             # Consulta compleja con JOINs (simulando operación costosa)
-            query = """
-                SELECT 
-                    p.id,
-                    p.sku,
-                    p.name,
-                    p.description,
-                    p.unit_price,
-                    p.stock_quantity,
-                    p.min_stock_level,
-                    p.supplier,
-                    c.name as category_name,
-                    c.description as category_description,
-                    COUNT(it.id) as transaction_count
+            query = f"""
+                SELECT {', '.join(columns)}
                 FROM products p
-                INNER JOIN product_categories c ON p.category_id = c.id
-                LEFT JOIN inventory_transactions it ON p.id = it.product_id
-                GROUP BY p.id, p.sku, p.name, p.description, p.unit_price, 
-                         p.stock_quantity, p.min_stock_level, p.supplier,
-                         c.name, c.description
+                {' '.join(joins)}
+                {'GROUP BY ' + ', '.join(group_by) if group_by else ''}
                 ORDER BY p.name
                 LIMIT 10000
             """
@@ -61,12 +135,12 @@ def sql_list(request):
         
         elapsed_time = (time.time() - start_time) * 1000  # Convert to milliseconds
         
-        return Response({
-            'data': results,
+        return _encoded_response(results, {
             'count': len(results),
             'elapsed_time_ms': round(elapsed_time, 2),
             'database': 'PostgreSQL',
-            'query_type': 'Complex JOIN'
+            'query_type': 'Complex JOIN' if group_by else 'Simple SELECT',
+            'mode': mode
         })
     
     except Exception as e:
@@ -77,40 +151,222 @@ def sql_list(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _parse_keyset_params(request):
+    """
+    Leer ?after=<name,sku>&limit= para la paginación keyset.
+    Devuelve (after, limit) o lanza ValueError si los parámetros son inválidos.
+    """
+    after = request.GET.get('after')
+    limit = request.GET.get('limit')
+
+    if limit is None:
+        limit = settings.INVENTORY_PAGE_SIZE
+    else:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+    limit = min(limit, settings.INVENTORY_MAX_PAGE_SIZE)
+
+    if after:
+        # El SKU no contiene comas, el nombre sí puede
+        if ',' not in after:
+            raise ValueError('after must have the form <name,sku>')
+        name, sku = after.rsplit(',', 1)
+        after = (name, sku)
+
+    return after, limit
+
+
+def _keyset_filter(after, field='name'):
+    """Filtro Mongo para los documentos posteriores a (valor, sku) en orden (field, _id)"""
+    if not after:
+        return {}
+    value, sku = after
+    return {'$or': [
+        {field: {'$gt': value}},
+        {field: value, '_id': {'$gt': sku}},
+    ]}
+
+
 @api_view(['GET'])
 def nosql_list(request):
     """
     Endpoint RÁPIDO - Consulta simple a MongoDB (CQRS Optimizado)
     Documentos desnormalizados para lectura rápida
+
+    Con ?after=<name,sku> y/o ?limit= devuelve una página keyset
+    (índice compuesto name/_id) en lugar de los 10,000 documentos.
+    ?profile= o ?fields= limitan los campos devueltos (proyección).
     """
     start_time = time.time()
     
     try:
-        collection = get_inventory_collection()
-        
-        # Consulta simple y rápida a MongoDB
-        # Los documentos ya están desnormalizados, no necesitamos JOINs
-        cursor = collection.find({}).limit(10000).sort('name', 1)
-        
-        results = list(cursor)
+        paginated = 'after' in request.GET or 'limit' in request.GET
+        try:
+            after, limit = _parse_keyset_params(request)
+            fields = resolve_fields(request.GET, MONGO_FIELDS)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not paginated:
+            limit = 10000
+
+        def load():
+            collection = get_inventory_collection()
+            
+            # Consulta simple y rápida a MongoDB
+            # Los documentos ya están desnormalizados, no necesitamos JOINs
+            cursor = (
+                collection.find(_keyset_filter(after), mongo_projection(fields))
+                .sort([('name', 1), ('_id', 1)])
+                .limit(limit)
+                .batch_size(min(limit, settings.MONGODB_BATCH_SIZE))
+            )
+            
+            results = list(cursor)
+            
+            # Convertir ObjectId a string para JSON serialization
+            for item in results:
+                if '_id' in item:
+                    item['_id'] = str(item['_id'])
+            
+            meta = {
+                'count': len(results),
+                'database': 'MongoDB',
+                'query_type': 'Simple Find (CQRS)'
+            }
+            if paginated:
+                last = results[-1] if len(results) == limit else None
+                meta['query_type'] = 'Keyset Page (CQRS)'
+                meta['next_after'] = f"{last['name']},{last['_id']}" if last else None
+            return results, meta
         
-        # Convertir ObjectId a string para JSON serialization
-        for item in results:
-            if '_id' in item:
+        return _cached_response('nosql_list', request.GET, start_time, load,
+                                per_document=_shows_stock(fields))
+    
+    except Exception as e:
+        logger.error(f"Error in nosql_list: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def nosql_stream(request):
+    """
+    Variante streaming de nosql-list: escribe el arreglo JSON documento por
+    documento sobre el cursor de PyMongo, sin materializar la lista completa.
+    Acepta los mismos parámetros ?after=, ?limit= (por defecto 10,000),
+    ?profile= y ?fields=.
+    """
+    start_time = time.time()
+
+    try:
+        after, limit = _parse_keyset_params(request)
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if 'limit' not in request.GET:
+        limit = 10000
+
+    try:
+        collection = get_inventory_collection()
+        cursor = (
+            collection.find(_keyset_filter(after), mongo_projection(fields))
+            .sort([('name', 1), ('_id', 1)])
+            .limit(limit)
+            .batch_size(settings.MONGODB_BATCH_SIZE)
+        )
+    except Exception as e:
+        logger.error(f"Error in nosql_stream: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def generate():
+        count = 0
+        yield '{"data": ['
+        try:
+            for item in cursor:
                 item['_id'] = str(item['_id'])
-        
-        elapsed_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        
+                yield (', ' if count else '') + json.dumps(item)
+                count += 1
+        except Exception as e:
+            # Los encabezados ya se enviaron: se reporta el error en el envelope
+            logger.error(f"Error in nosql_stream: {e}")
+            yield '], "error": ' + json.dumps(str(e))
+        else:
+            yield ']'
+        finally:
+            cursor.close()
+        elapsed_time = (time.time() - start_time) * 1000
+        # Resto del envelope: se omite la '{' inicial para cerrar el objeto abierto
+        yield ', ' + json.dumps({
+            'count': count,
+            'elapsed_time_ms': round(elapsed_time, 2),
+            'database': 'MongoDB',
+            'query_type': 'Streaming Find (CQRS)'
+        })[1:]
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def _query_page(request, namespace, query, query_type, sort_field='name', families=('catalog',)):
+    """
+    Página keyset (?after=<valor,sku>&limit=) de los documentos que cumplen
+    `query`, ordenados por (sort_field, _id). Cada consulta tiene un índice
+    declarado en INVENTORY_INDEXES con el filtro de igualdad como prefijo.
+    `families` son las familias de versiones de caché de las que depende.
+    """
+    start_time = time.time()
+
+    try:
+        after, limit = _parse_keyset_params(request)
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+        if after and sort_field == 'unit_price':
+            try:
+                after = (float(after[0]), after[1])
+            except ValueError:
+                raise ValueError('after must have the form <price,sku>')
+    except ValueError as e:
         return Response({
-            'data': results,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def load():
+        projection = mongo_projection(fields)
+        if fields is not None:
+            projection[sort_field] = 1
+        keyset = _keyset_filter(after, sort_field)
+        collection = get_inventory_collection()
+        cursor = (
+            collection.find({'$and': [query, keyset]} if keyset else query, projection)
+            .sort([(sort_field, 1), ('_id', 1)])
+            .limit(limit)
+            .batch_size(min(limit, settings.MONGODB_BATCH_SIZE))
+        )
+        results = list(cursor)
+
+        last = results[-1] if len(results) == limit else None
+        return results, {
             'count': len(results),
-            'elapsed_time_ms': round(elapsed_time, 2),
+            'next_after': f"{last[sort_field]},{last['_id']}" if last else None,
             'database': 'MongoDB',
-            'query_type': 'Simple Find (CQRS)'
-        })
-    
+            'query_type': query_type
+        }
+
+    try:
+        params = dict(request.GET.lists(), query=repr(query))
+        return _cached_response(namespace, params, start_time, load, families,
+                                per_document=_shows_stock(fields))
+
     except Exception as e:
-        logger.error(f"Error in nosql_list: {e}")
+        logger.error(f"Error in {query_type}: {e}")
         return Response({
             'error': str(e),
             'elapsed_time_ms': (time.time() - start_time) * 1000
@@ -118,25 +374,407 @@ def nosql_list(request):
 
 
 @api_view(['GET'])
-def inventory_stats(request):
-    """Estadísticas del inventario desde MongoDB"""
+def low_stock(request):
+    """Productos con stock por debajo del mínimo (índice parcial is_low_stock)"""
+    return _query_page(
+        request, 'low_stock', {'is_low_stock': True}, 'Low Stock (CQRS)', families=('catalog', 'low_stock')
+    )
+
+
+@api_view(['GET'])
+def products_by_category(request, category_id):
+    """Productos de una categoría, ordenados por nombre"""
+    return _query_page(request, 'by_category', {'category.id': category_id}, 'By Category (CQRS)')
+
+
+@api_view(['GET'])
+def products_by_supplier(request):
+    """Productos de un proveedor (?supplier=, coincidencia exacta), ordenados por nombre"""
+    supplier = request.GET.get('supplier')
+    if not supplier:
+        return Response({
+            'error': 'supplier is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return _query_page(request, 'by_supplier', {'supplier': supplier}, 'By Supplier (CQRS)')
+
+
+@api_view(['GET'])
+def products_by_price(request):
+    """
+    Productos con ?min_price= <= unit_price <= ?max_price= (ambos opcionales),
+    ordenados por precio. El cursor ?after= tiene la forma <precio,sku>.
+    """
+    price_range = {}
     try:
+        if request.GET.get('min_price'):
+            price_range['$gte'] = float(request.GET['min_price'])
+        if request.GET.get('max_price'):
+            price_range['$lte'] = float(request.GET['max_price'])
+    except ValueError:
+        return Response({
+            'error': 'min_price and max_price must be numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not price_range:
+        return Response({
+            'error': 'min_price or max_price is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return _query_page(
+        request, 'by_price', {'unit_price': price_range}, 'By Price Range (CQRS)', sort_field='unit_price'
+    )
+
+
+@api_view(['GET'])
+def search_products(request):
+    """
+    Búsqueda de texto completo (índice de texto sku/name/description)
+    ordenada por relevancia. Paginación con ?page= (desde 1) y ?limit=.
+    """
+    start_time = time.time()
+
+    q = request.GET.get('q', '').strip()
+    try:
+        if not q:
+            raise ValueError('q is required')
+        _, limit = _parse_keyset_params(request)
+        page = int(request.GET.get('page', 1))
+        if page < 1:
+            raise ValueError('page must be a positive integer')
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def load():
+        projection = mongo_projection(fields)
+        projection['score'] = {'$meta': 'textScore'}
         collection = get_inventory_collection()
-        
-        total_products = collection.count_documents({})
-        low_stock = collection.count_documents({
-            '$expr': {'$lt': ['$stock_quantity', '$min_stock_level']}
-        })
-        
+        cursor = (
+            collection.find({'$text': {'$search': q}}, projection)
+            .sort([('score', {'$meta': 'textScore'}), ('_id', 1)])
+            .skip((page - 1) * limit)
+            # Un documento extra indica si hay página siguiente
+            .limit(limit + 1)
+        )
+        results = list(cursor)
+        has_next = len(results) > limit
+        results = results[:limit]
+
+        return results, {
+            'count': len(results),
+            'page': page,
+            'next_page': page + 1 if has_next else None,
+            'database': 'MongoDB',
+            'query_type': 'Text Search (CQRS)'
+        }
+
+    try:
+        return _cached_response('search', request.GET, start_time, load,
+                                per_document=_shows_stock(fields))
+
+    except Exception as e:
+        logger.error(f"Error in search_products: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def typeahead(request):
+    """
+    Sugerencias por prefijo de nombre o SKU (?q=, ?limit= hasta 50).
+    Usa el índice multikey de search_tokens y devuelve solo sku y nombre.
+    """
+    start_time = time.time()
+
+    try:
+        query = prefix_query(request.GET.get('q', ''))
+        limit = min(int(request.GET.get('limit', 10)), 50)
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def load():
+        collection = get_inventory_collection()
+        results = list(
+            collection.find(query, {'_id': 0, 'sku': 1, 'name': 1})
+            .sort([('name', 1), ('_id', 1)])
+            .limit(limit)
+        )
+
+        return results, {
+            'count': len(results),
+            'database': 'MongoDB',
+            'query_type': 'Prefix Search (CQRS)'
+        }
+
+    try:
+        # Solo sku y nombre: no depende del stock
+        return _cached_response('typeahead', request.GET, start_time, load, per_document=False)
+
+    except Exception as e:
+        logger.error(f"Error in typeahead: {e}")
         return Response({
-            'total_products': total_products,
-            'low_stock_items': low_stock,
-            'database': 'MongoDB'
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def product_detail(request, sku):
+    """Producto por SKU (_id del read model). Acepta ?profile= y ?fields="""
+    start_time = time.time()
+
+    try:
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def load():
+        product = get_inventory_collection().find_one({'_id': sku}, mongo_projection(fields))
+        return {'product': product}, [sku]
+
+    try:
+        # Solo depende de su SKU (incluye altas y bajas de ese SKU)
+        entry, source = cached_read('product', dict(request.GET.lists(), sku=sku), load, families=())
+    except Exception as e:
+        logger.error(f"Error in product_detail: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if entry['product'] is None:
+        return Response({
+            'error': 'Product not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'data': entry['product'],
+        'elapsed_time_ms': round((time.time() - start_time) * 1000, 2),
+        'database': 'MongoDB',
+        'cache': source
+    })
+
+
+@api_view(['POST'])
+def products_lookup(request):
+    """
+    Varios productos por SKU en una sola consulta $in.
+    Body: {"skus": ["SKU-1", ...]} (máximo INVENTORY_LOOKUP_MAX_SKUS).
+    Devuelve los productos en el orden pedido, los SKUs inexistentes en
+    'missing', la época de los datos en 'version' y en 'versions' la versión
+    de cada SKU devuelto ([época, contador del SKU], crece con cada cambio).
+    """
+    start_time = time.time()
+
+    if not isinstance(request.data, dict):
+        return Response({
+            'error': 'body must be a JSON object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    skus = request.data.get('skus')
+    try:
+        if not isinstance(skus, list) or not all(isinstance(sku, str) for sku in skus):
+            raise ValueError('skus must be a list of strings')
+        if len(skus) > settings.INVENTORY_LOOKUP_MAX_SKUS:
+            raise ValueError(f'At most {settings.INVENTORY_LOOKUP_MAX_SKUS} skus per request')
+        fields = resolve_fields(request.GET, MONGO_FIELDS)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        skus = list(dict.fromkeys(skus))
+        # Versiones leídas antes que los documentos: nunca más nuevas que los datos
+        versions = get_cache_versions(settings.INVENTORY_CACHE_VERSION_TTL)
+        collection = get_inventory_collection()
+        found = {
+            product['_id']: product
+            for product in collection.find({'_id': {'$in': skus}}, mongo_projection(fields))
+        }
+        results = [found[sku] for sku in skus if sku in found]
+
+        elapsed_time = (time.time() - start_time) * 1000
+
+        return _encoded_response(results, {
+            'count': len(results),
+            'missing': [sku for sku in skus if sku not in found],
+            'version': versions['epoch'],
+            'versions': {
+                sku: [versions['epoch'], versions['skus'].get(sku_bucket(sku), 0)] for sku in found
+            },
+            'elapsed_time_ms': round(elapsed_time, 2),
+            'database': 'MongoDB',
+            'query_type': 'Batch Lookup (CQRS)'
         })
+
+    except Exception as e:
+        logger.error(f"Error in products_lookup: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _parse_reference(data):
+    """Referencia obligatoria de la reserva (p.ej. el número de pedido)"""
+    if not isinstance(data, dict):
+        raise ValueError('body must be a JSON object')
+    reference = data.get('reference')
+    if not isinstance(reference, str) or not reference.strip():
+        raise ValueError('reference is required')
+    if len(reference) > 100:
+        raise ValueError('reference must be at most 100 characters')
+    return reference.strip()
+
+
+def _stock_change(start_time, apply):
+    """Aplicar la reserva o devolución y traducir los rechazos a respuestas HTTP"""
+    try:
+        return apply()
+    except ReservationError as e:
+        return Response({
+            'error': 'Reservation rejected',
+            'unknown': e.unknown,
+            'insufficient': e.insufficient
+        }, status=status.HTTP_409_CONFLICT)
+    except ReservationConflict as e:
+        if e.status == 'UNKNOWN':
+            return Response({
+                'error': 'Reservation not found',
+                'reference': e.reference
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'error': 'Reference already used' if e.status == 'MISMATCH' else 'Reservation is not active',
+            'reference': e.reference,
+            'status': e.status
+        }, status=status.HTTP_409_CONFLICT)
+    except OperationalError as e:
+        # lock_timeout: otro pedido tiene bloqueados los mismos productos o la referencia
+        logger.warning(f"Stock change timed out: {e}")
+        return Response({
+            'error': 'Products busy, retry the reservation'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        logger.error(f"Error applying stock change: {e}")
+        return Response({
+            'error': str(e),
+            'elapsed_time_ms': (time.time() - start_time) * 1000
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _stock_response(start_time, reference, changed, **extra):
+    return Response({
+        'reference': reference,
+        **extra,
+        'items': [
+            {'sku': sku, 'quantity': quantity, 'stock_quantity': stock}
+            for sku, quantity, stock in changed
+        ],
+        'elapsed_time_ms': round((time.time() - start_time) * 1000, 2),
+        'database': 'PostgreSQL'
+    })
+
+
+@api_view(['POST'])
+def reserve(request):
+    """
+    Reservar stock para un pedido (todo o nada).
+    Body: {"items": [{"sku": "...", "quantity": 2}, ...], "reference": "ORD-..."}
+    Responde 409 con los SKUs desconocidos o sin stock suficiente, o si la
+    referencia ya se usó con otras líneas. Repetir la misma reserva es
+    idempotente: responde la ya aplicada con 'created': false.
+    """
+    start_time = time.time()
+
+    try:
+        reference = _parse_reference(request.data)
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            raise ValueError('items must be a non-empty list')
+        quantities = normalize_items(items)
+        if len(quantities) > settings.INVENTORY_RESERVATION_MAX_ITEMS:
+            raise ValueError(f'At most {settings.INVENTORY_RESERVATION_MAX_ITEMS} skus per reservation')
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def apply():
+        changed, created = reserve_stock(quantities, reference)
+        return _stock_response(start_time, reference, changed, status='ACTIVE', created=created)
+
+    return _stock_change(start_time, apply)
+
+
+@api_view(['POST'])
+def release(request):
+    """
+    Devolver al stock la reserva activa de una referencia.
+    Body: {"reference": "ORD-..."}. Repone exactamente lo reservado y la
+    marca liberada; 404 si la referencia no tiene reserva y 409 si ya no
+    está activa.
+    """
+    start_time = time.time()
+
+    try:
+        reference = _parse_reference(request.data)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def apply():
+        changed = release_reservation(reference)
+        return _stock_response(start_time, reference, changed, status='RELEASED')
+
+    return _stock_change(start_time, apply)
+
+
+def format_stats(stats):
+    """Respuesta de /inventory/stats a partir del documento materializado"""
+    categories = [
+        {
+            'id': int(cat_id),
+            'name': category.get('name'),
+            'count': category.get('count', 0),
+            'low_stock_items': category.get('low_stock', 0),
+            'stock_value': round(category.get('stock_value', 0), 2),
+        }
+        for cat_id, category in sorted(stats.get('categories', {}).items(), key=lambda kv: int(kv[0]))
+    ]
+    
+    return {
+        'total_products': stats.get('total_products', 0),
+        'low_stock_items': stats.get('low_stock_items', 0),
+        'stock_value': round(stats.get('stock_value', 0), 2),
+        'categories': categories,
+        'database': 'MongoDB'
+    }
+
+
+@api_view(['GET'])
+def inventory_stats(request):
+    """
+    Estadísticas del inventario desde MongoDB
+    Lee el documento materializado que mantiene la sincronización (O(1))
+    """
+    try:
+        stats, source = cached_read(
+            'stats', {}, lambda: (format_stats(get_inventory_stats()), None), families=('stats',)
+        )
+        return Response({**stats, 'cache': source})
     
     except Exception as e:
         logger.error(f"Error in inventory_stats: {e}")
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
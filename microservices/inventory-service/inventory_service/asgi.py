@@ -7,6 +7,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_service.settings')
+os.environ.setdefault('INVENTORY_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
 
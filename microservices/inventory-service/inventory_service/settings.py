@@ -23,6 +23,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # OpClass en los índices de expresiones de Product
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'inventory',
@@ -59,6 +61,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'inventory_service.wsgi.application'
 
+# Vistas async/ (Motor): solo se registran bajo ASGI, asgi.py las activa.
+# Bajo WSGI cada llamada correría en un event loop nuevo con su propio cliente.
+INVENTORY_ASYNC_VIEWS = os.getenv('INVENTORY_ASYNC_VIEWS', 'False') == 'True'
+
 # PostgreSQL Database (Write Model)
 DATABASES = {
     'default': {
@@ -75,6 +81,51 @@ DATABASES = {
 MONGODB_HOST = os.getenv('MONGODB_HOST', 'localhost')
 MONGODB_PORT = int(os.getenv('MONGODB_PORT', '27017'))
 MONGODB_DB = os.getenv('MONGODB_DB', 'provesi_inventory')
+# Documentos por lote que devuelve el cursor de PyMongo en cada getMore
+MONGODB_BATCH_SIZE = int(os.getenv('MONGODB_BATCH_SIZE', '1000'))
+
+# Paginación keyset del read model (?after=<name,sku>&limit=)
+INVENTORY_PAGE_SIZE = int(os.getenv('INVENTORY_PAGE_SIZE', '100'))
+INVENTORY_MAX_PAGE_SIZE = int(os.getenv('INVENTORY_MAX_PAGE_SIZE', '1000'))
+
+# Máximo de SKUs por llamada a POST /inventory/products/lookup
+INVENTORY_LOOKUP_MAX_SKUS = int(os.getenv('INVENTORY_LOOKUP_MAX_SKUS', '500'))
+
+# Reserva de stock: espera máxima por el bloqueo de un producto antes de responder 503
+INVENTORY_RESERVATION_LOCK_TIMEOUT_MS = int(os.getenv('INVENTORY_RESERVATION_LOCK_TIMEOUT_MS', '2000'))
+INVENTORY_RESERVATION_MAX_ITEMS = int(os.getenv('INVENTORY_RESERVATION_MAX_ITEMS', '500'))
+
+# Consulta de sql-list: 'legacy' (JOIN + GROUP BY, línea base de los experimentos)
+# u 'optimized' (contador + índice por nombre, opcional)
+INVENTORY_SQL_MODE = os.getenv('INVENTORY_SQL_MODE', 'legacy')
+
+# Caché read-through de lecturas del read model (segundos / entradas y bytes del LRU por proceso)
+INVENTORY_CACHE_ENABLED = os.getenv('INVENTORY_CACHE_ENABLED', 'True') == 'True'
+INVENTORY_CACHE_TTL = int(os.getenv('INVENTORY_CACHE_TTL', '30'))
+INVENTORY_CACHE_MAX_SIZE = int(os.getenv('INVENTORY_CACHE_MAX_SIZE', '1024'))
+INVENTORY_CACHE_MAX_BYTES = int(os.getenv('INVENTORY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Contadores de versión por SKU (bucket = crc32(sku) % N) para invalidar solo lo afectado
+INVENTORY_CACHE_SKU_BUCKETS = int(os.getenv('INVENTORY_CACHE_SKU_BUCKETS', '4096'))
+# Espera máxima por la consulta de otra petición ante un fallo de caché
+INVENTORY_CACHE_LOCK_TIMEOUT = float(os.getenv('INVENTORY_CACHE_LOCK_TIMEOUT', '5'))
+# Cada cuánto se relee la versión de datos de MongoDB (retraso máximo de la invalidación)
+INVENTORY_CACHE_VERSION_TTL = float(os.getenv('INVENTORY_CACHE_VERSION_TTL', '1'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Nivel compartido opcional, p.ej. django.core.cache.backends.redis.RedisCache
+# con redis://host:6379/1 (LocMemCache como sustituto local)
+INVENTORY_SHARED_CACHE_BACKEND = os.getenv('INVENTORY_SHARED_CACHE_BACKEND', '')
+if INVENTORY_SHARED_CACHE_BACKEND:
+    CACHES['inventory_shared'] = {
+        'BACKEND': INVENTORY_SHARED_CACHE_BACKEND,
+        'LOCATION': os.getenv('INVENTORY_SHARED_CACHE_LOCATION', ''),
+        'TIMEOUT': INVENTORY_CACHE_TTL,
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {
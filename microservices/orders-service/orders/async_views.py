@@ -0,0 +1,61 @@
+"""
+Vistas asíncronas (ASGI) de lectura del Orders Service
+
+get_order con el ORM async de Django y la caché con aget/aset: mientras
+espera a la base de datos no ocupa un hilo del worker.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from .middleware import async_optional_auth
+from .models import Order, OrderItem
+from .views import ORDER_DETAIL_FIELDS, ORDER_ITEM_FIELDS, _order_cache_key, _order_etag, order_payload
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def health_check(request):
+    """Health check endpoint (ASGI)"""
+    return JsonResponse({
+        'status': 'ok',
+        'service': 'orders-service',
+        'mode': 'async'
+    })
+
+
+@async_optional_auth
+async def get_order(request, order_id):
+    """Detalle de un pedido (misma respuesta, ETag y caché que la vista síncrona)"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        order = await Order.objects.filter(id=order_id).values(*ORDER_DETAIL_FIELDS).afirst()
+        if order is None:
+            return JsonResponse({
+                'error': 'Order not found'
+            }, status=404)
+        
+        etag = _order_etag(order_id, order['updated_at'])
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            return response
+        
+        cache_key = _order_cache_key(order_id, order['updated_at'])
+        payload = await cache.aget(cache_key) if settings.ORDERS_DETAIL_CACHE_TTL else None
+        if payload is None:
+            items = [item async for item in OrderItem.objects.filter(order_id=order_id).values(*ORDER_ITEM_FIELDS)]
+            payload = order_payload(order, items)
+            if settings.ORDERS_DETAIL_CACHE_TTL:
+                await cache.aset(cache_key, payload, settings.ORDERS_DETAIL_CACHE_TTL)
+        
+        response = JsonResponse(payload)
+        response['ETag'] = etag
+        return response
+    
+    except Exception as e:
+        logger.error(f"Error getting order (async): {e}")
+        return JsonResponse({
+            'error': str(e)
+        }, status=500)
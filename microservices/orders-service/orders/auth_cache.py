@@ -0,0 +1,95 @@
+"""
+Caché local de validaciones de token para el middleware RBAC
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_key(token):
+    """Clave de caché: hash del token (no se guarda el JWT en memoria)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def token_expiration(token):
+    """
+    Leer el claim `exp` del payload del JWT sin verificar la firma.
+    Solo se usa para acotar el TTL; la validación la hace el Auth Service.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenCache:
+    """
+    Caché LRU con TTL de resultados de validación, seguro entre hilos.
+    Los resultados positivos viven min(ttl, exp del token); los negativos
+    usan un TTL corto.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, negative_ttl=10):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token):
+        """Devolver el resultado cacheado del token o None"""
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token, result, valid):
+        """Guardar un resultado; `valid` indica si es positivo o negativo"""
+        now = time.time()
+        if valid:
+            expires_at = now + self.ttl
+            exp = token_expiration(token)
+            if exp is not None:
+                expires_at = min(expires_at, exp)
+        else:
+            expires_at = now + self.negative_ttl
+        if expires_at <= now:
+            return
+
+        key = token_key(token)
+        with self._lock:
+            self._entries[key] = (result, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
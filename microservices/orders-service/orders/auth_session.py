@@ -0,0 +1,67 @@
+"""
+Sesión HTTP compartida (pool keep-alive) para las llamadas al Auth Service
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+_session = None
+_adapter = None
+_lock = threading.Lock()
+
+
+def get_auth_session():
+    """
+    Obtener (o crear) la sesión del proceso. Reutiliza conexiones TCP/TLS
+    entre requests y reintenta con backoff los errores de conexión y 502/503/504.
+    """
+    global _session, _adapter
+    if _session is None:
+        with _lock:
+            if _session is None:
+                retry = Retry(
+                    total=settings.AUTH_HTTP_RETRIES,
+                    backoff_factor=settings.AUTH_HTTP_BACKOFF,
+                    status_forcelist=[502, 503, 504],
+                    # /validate no modifica estado: es seguro reintentar el POST
+                    allowed_methods=['POST'],
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.AUTH_HTTP_POOL_SIZE,
+                    pool_block=False,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _adapter = adapter
+                _session = session
+    return _session
+
+
+def auth_timeout():
+    """Timeouts (connect, read) de las llamadas al Auth Service"""
+    return (settings.AUTH_HTTP_CONNECT_TIMEOUT, settings.AUTH_HTTP_READ_TIMEOUT)
+
+
+def pool_stats():
+    """Conexiones abiertas vs requests servidos (requests - conexiones = reutilizadas)"""
+    if _adapter is None:
+        return {'connections': 0, 'requests': 0, 'reused': 0}
+    pools = _adapter.poolmanager.pools
+    connections = requests_count = 0
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        connections += pool.num_connections
+        requests_count += pool.num_requests
+    return {
+        'connections': connections,
+        'requests': requests_count,
+        'reused': max(requests_count - connections, 0),
+    }
@@ -0,0 +1,349 @@
+"""
+Caché local de SKU -> (nombre, precio, stock) del Inventory Service
+
+create_order valida y precia sus líneas contra esta caché en lugar de
+llamar al inventario por cada ítem:
+- Los SKUs ausentes se piden en un solo POST /inventory/products/lookup.
+- Una entrada fresca (< INVENTORY_SNAPSHOT_TTL) se usa directamente.
+- Una entrada vencida pero dentro de INVENTORY_SNAPSHOT_STALE_TTL se usa
+  y se revalida en segundo plano (stale-while-revalidate).
+- Cada lookup devuelve la versión de cada SKU; una respuesta más antigua
+  que la entrada guardada (p.ej. una revalidación lenta) no la reemplaza.
+- Las revalidaciones corren en un ejecutor acotado
+  (INVENTORY_SNAPSHOT_REFRESH_WORKERS hilos), nunca un hilo por petición.
+- Si el inventario no responde se sirven entradas de cualquier edad.
+
+También expone la reserva/devolución de stock del Inventory Service.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = 'sku,name,unit_price,stock_quantity'
+
+
+class InventoryUnavailable(Exception):
+    """El Inventory Service no respondió y faltan SKUs en la caché"""
+
+
+class InventoryRejected(Exception):
+    """El inventario rechazó la petición por inválida (4xx): no se aplicó nada"""
+
+    def __init__(self, status_code, detail):
+        self.status_code = status_code
+        self.detail = detail
+        super().__init__(f"{status_code}: {detail}")
+
+
+def _rejection(response):
+    """InventoryRejected con el mensaje de error de una respuesta 4xx"""
+    try:
+        detail = response.json().get('error', '')
+    except (ValueError, AttributeError):
+        detail = ''
+    return InventoryRejected(response.status_code, detail or response.reason)
+
+
+class StockRejected(Exception):
+    """El inventario rechazó la reserva: SKUs desconocidos o sin stock"""
+
+    def __init__(self, unknown, insufficient):
+        self.unknown = unknown
+        self.insufficient = insufficient
+        super().__init__(f"unknown={unknown} insufficient={insufficient}")
+
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+def get_inventory_session():
+    """
+    Sesión HTTP del proceso hacia el Inventory Service (pool keep-alive).
+    Reintenta los POST: lookup es una lectura y las reservas son idempotentes
+    por referencia, así que repetirlas tras un timeout no descuenta dos veces.
+    """
+    session = _sessions.get('default')
+    if session is None:
+        with _session_lock:
+            session = _sessions.get('default')
+            if session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.INVENTORY_HTTP_POOL_SIZE,
+                    max_retries=Retry(
+                        total=settings.INVENTORY_HTTP_RETRIES,
+                        backoff_factor=0.1,
+                        status_forcelist=[502, 503, 504],
+                        allowed_methods=['POST'],
+                        raise_on_status=False,
+                    ),
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions['default'] = session
+    return session
+
+
+def _stock_change(path, payload):
+    """POST de reserva/devolución; devuelve la respuesta si no es un error de servidor"""
+    try:
+        response = get_inventory_session().post(
+            f"{settings.INVENTORY_SERVICE_URL}/api/v1/inventory/{path}",
+            json=payload,
+            timeout=settings.INVENTORY_HTTP_TIMEOUT,
+        )
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+    except requests.RequestException as e:
+        raise InventoryUnavailable(str(e))
+
+
+def reserve_stock(quantities, reference):
+    """
+    Reservar {sku: cantidad} (todo o nada) con `reference` como clave de
+    idempotencia. Si tras los reintentos el inventario no respondió, la
+    reserva pudo aplicarse igualmente: se compensa devolviéndola por
+    referencia antes de lanzar InventoryUnavailable. Lanza StockRejected si
+    falta stock e InventoryRejected si el inventario rechaza la petición.
+    """
+    try:
+        response = _stock_change('reservations', {
+            'items': [{'sku': sku, 'quantity': quantity} for sku, quantity in quantities.items()],
+            'reference': reference,
+        })
+    except InventoryUnavailable:
+        try:
+            release_stock(reference)
+        except InventoryUnavailable as e:
+            logger.error(f"Could not release possibly applied reservation {reference}: {e}")
+        raise
+    if response.status_code == 409:
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        raise StockRejected(payload.get('unknown', []), payload.get('insufficient', []))
+    if response.status_code >= 400:
+        raise _rejection(response)
+
+
+def release_stock(reference):
+    """
+    Devolver al stock la reserva de `reference` (el inventario repone lo que
+    registró). Una referencia sin reserva activa no tiene nada que devolver.
+    Lanza InventoryRejected o InventoryUnavailable.
+    """
+    response = _stock_change('reservations/release', {'reference': reference})
+    if response.status_code in (404, 409):
+        logger.info(f"No active reservation to release for {reference}")
+    elif response.status_code >= 400:
+        raise _rejection(response)
+
+
+def fetch_snapshots(skus):
+    """
+    Pedir los SKUs al Inventory Service en un solo lookup.
+    Devuelve ({sku: snapshot}, {sku: versión}) con versiones comparables
+    (época, contador). Lanza InventoryRejected si el inventario rechaza la
+    petición (4xx) e InventoryUnavailable si no responde.
+    """
+    try:
+        response = get_inventory_session().post(
+            f"{settings.INVENTORY_SERVICE_URL}/api/v1/inventory/products/lookup",
+            params={'fields': SNAPSHOT_FIELDS},
+            json={'skus': list(skus)},
+            timeout=settings.INVENTORY_HTTP_TIMEOUT,
+        )
+        if 400 <= response.status_code < 500:
+            raise _rejection(response)
+        response.raise_for_status()
+        payload = response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise InventoryUnavailable(str(e))
+
+    snapshots = {
+        product['sku']: {
+            'sku': product['sku'],
+            'name': product['name'],
+            'unit_price': Decimal(str(product['unit_price'])).quantize(Decimal('0.01')),
+            'stock_quantity': product['stock_quantity'],
+        }
+        for product in payload.get('data', [])
+    }
+    # Un inventario sin 'versions' solo informa la época global
+    epoch = payload.get('version', 0)
+    versions = payload.get('versions') or {}
+    return snapshots, {sku: tuple(versions.get(sku, (epoch, 0))) for sku in snapshots}
+
+
+class SnapshotCache:
+    """
+    Caché LRU acotada de snapshots por SKU con stale-while-revalidate,
+    segura entre hilos. `fetch` recibe una lista de SKUs y devuelve
+    ({sku: snapshot}, {sku: versión}).
+    """
+
+    def __init__(self, fetch=fetch_snapshots, max_size=10000, ttl=30, stale_ttl=300, batch_size=500,
+                 refresh_workers=1):
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.batch_size = batch_size
+        self.refresh_workers = refresh_workers
+        self._executor = None
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.errors = 0
+
+    def get_many(self, skus):
+        """
+        Devolver {sku: snapshot} de los SKUs existentes en el inventario.
+        Los SKUs que no existen no aparecen en el resultado. Lanza
+        InventoryUnavailable si faltan SKUs y el inventario no responde e
+        InventoryRejected si rechaza el lookup.
+        """
+        now = time.time()
+        result = {}
+        missing = []
+        stale = []
+        with self._lock:
+            for sku in dict.fromkeys(skus):
+                entry = self._entries.get(sku)
+                if entry is None:
+                    missing.append(sku)
+                    continue
+                snapshot, fetched_at, _ = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.hits += 1
+                    result[sku] = snapshot
+                elif age < self.stale_ttl:
+                    self.stale_hits += 1
+                    result[sku] = snapshot
+                    stale.append(sku)
+                else:
+                    missing.append(sku)
+                self._entries.move_to_end(sku)
+            self.misses += len(missing)
+
+        if stale:
+            self._revalidate_async(stale)
+
+        if missing:
+            try:
+                result.update(self._fetch(missing))
+            except InventoryUnavailable:
+                # stale-if-error: entradas vencidas antes que fallar el pedido
+                with self._lock:
+                    for sku in missing:
+                        if sku in self._entries:
+                            result[sku] = self._entries[sku][0]
+                if any(sku not in result for sku in missing):
+                    raise
+        return result
+
+    def _fetch(self, skus):
+        """Lookup por lotes de batch_size y actualización de las entradas"""
+        found = {}
+        for start in range(0, len(skus), self.batch_size):
+            batch = skus[start:start + self.batch_size]
+            try:
+                snapshots, versions = self.fetch(batch)
+            except InventoryUnavailable as e:
+                self.errors += 1
+                logger.error(f"Inventory lookup failed for {len(batch)} SKUs: {e}")
+                raise
+            self.fetches += 1
+            found.update(snapshots)
+            self._store(batch, snapshots, versions)
+        return found
+
+    def _store(self, skus, snapshots, versions):
+        now = time.time()
+        with self._lock:
+            for sku in skus:
+                if sku in snapshots:
+                    version = versions.get(sku, (0, 0))
+                    current = self._entries.get(sku)
+                    if current is not None and current[2] > version:
+                        # Respuesta más antigua que la guardada: se conserva la nueva
+                        continue
+                    self._entries[sku] = (snapshots[sku], now, version)
+                    self._entries.move_to_end(sku)
+                else:
+                    # El SKU ya no existe en el inventario
+                    self._entries.pop(sku, None)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _revalidate_async(self, skus):
+        """
+        Encolar el refresco de los SKUs vencidos en el ejecutor del proceso.
+        Cada SKU se encola una sola vez mientras su refresco está pendiente,
+        así la cola no crece más allá de max_size SKUs.
+        """
+        with self._lock:
+            skus = [sku for sku in skus if sku not in self._refreshing]
+            self._refreshing.update(skus)
+            if not skus:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers, thread_name_prefix='inventory-snapshots'
+                )
+            executor = self._executor
+        executor.submit(self._revalidate, skus)
+
+    def _revalidate(self, skus):
+        try:
+            self._fetch(skus)
+        except InventoryUnavailable:
+            pass
+        except InventoryRejected as e:
+            logger.error(f"Inventory rejected revalidation of {len(skus)} SKUs: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(skus)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'refreshing': len(self._refreshing),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'fetches': self.fetches,
+                'errors': self.errors,
+            }
+
+
+# Caché del proceso usada por create_order
+snapshot_cache = SnapshotCache(
+    max_size=settings.INVENTORY_SNAPSHOT_MAX_SIZE,
+    ttl=settings.INVENTORY_SNAPSHOT_TTL,
+    stale_ttl=settings.INVENTORY_SNAPSHOT_STALE_TTL,
+    refresh_workers=settings.INVENTORY_SNAPSHOT_REFRESH_WORKERS,
+)
@@ -0,0 +1,139 @@
+"""
+Validación local de JWT (RS256) contra un JWKS cacheado en memoria
+
+Alternativa a llamar al Auth Service en cada request: las llaves públicas
+se descargan una vez, se refrescan en segundo plano y se vuelven a pedir
+si llega un token con un `kid` desconocido (rotación de llaves).
+"""
+import json
+import threading
+import time
+import urllib.request
+import jwt
+from jwt.algorithms import RSAAlgorithm
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailable(OSError):
+    """El JWKS no se pudo descargar o su contenido no es válido"""
+
+
+def _load_jwks(url, timeout=5):
+    """Descargar el documento JWKS (http(s):// o file:// para pruebas locales)"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        body = response.read()
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise JWKSUnavailable(f"Invalid JWKS document: {e}")
+
+
+class JWKSCache:
+    """
+    Llaves públicas del JWKS indexadas por `kid`, seguras entre hilos.
+    Un hilo daemon refresca el documento cada `refresh_interval` segundos;
+    un `kid` desconocido fuerza un refresco, como máximo uno cada
+    `min_refresh_interval` segundos.
+    """
+
+    def __init__(self, url, refresh_interval=600, min_refresh_interval=30):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0
+        self._refresher = None
+
+    def refresh(self):
+        """
+        Descargar el JWKS y reemplazar las llaves cacheadas.
+        Lanza OSError (JWKSUnavailable si el documento no es válido); las
+        llaves anteriores se conservan.
+        """
+        jwks = _load_jwks(self.url)
+        keys = {}
+        try:
+            for jwk in jwks.get('keys', []):
+                if jwk.get('kty') != 'RSA' or 'kid' not in jwk:
+                    continue
+                keys[jwk['kid']] = RSAAlgorithm.from_jwk(json.dumps(jwk))
+        except (AttributeError, TypeError, ValueError, KeyError, jwt.PyJWTError) as e:
+            raise JWKSUnavailable(f"Invalid JWKS document: {e}")
+        with self._lock:
+            self._keys = keys
+            self._last_refresh = time.time()
+        logger.info(f"Loaded {len(keys)} signing keys from JWKS")
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing JWKS: {e}")
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def get_key(self, kid):
+        """Llave pública del `kid`, refrescando el JWKS si no se conoce"""
+        with self._lock:
+            key = self._keys.get(kid)
+            can_refresh = time.time() - self._last_refresh >= self.min_refresh_interval
+        if key is None and can_refresh:
+            self.refresh()
+            with self._lock:
+                key = self._keys.get(kid)
+        self._start_refresher()
+        return key
+
+
+_jwks_cache = None
+
+
+def get_jwks_cache():
+    """Obtener (o crear) la caché de JWKS del proceso"""
+    global _jwks_cache
+    if _jwks_cache is None:
+        _jwks_cache = JWKSCache(
+            settings.AUTH_JWKS_URL,
+            refresh_interval=settings.AUTH_JWKS_REFRESH_INTERVAL,
+        )
+    return _jwks_cache
+
+
+def verify_token_local(token):
+    """
+    Verificar firma, audiencia, emisor y expiración del token localmente.
+    Devuelve (status_code, auth_data) con el mismo formato que el Auth Service.
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+        key = get_jwks_cache().get_key(kid)
+        if key is None:
+            return 401, {}
+
+        decoded = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=settings.AUTH0_AUDIENCE,
+            issuer=f"https://{settings.AUTH0_DOMAIN}/",
+        )
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Local token validation failed: {e}")
+        return 401, {}
+
+    return 200, {
+        'isValid': True,
+        'rol': decoded.get('https://provesi.com/rol') or decoded.get('rol'),
+        'userId': decoded.get('sub') or decoded.get('user_id'),
+    }
@@ -0,0 +1,50 @@
+"""
+Verifica (y opcionalmente repara) los totales de pedidos mantenidos por deltas
+"""
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Compara total_amount con la suma de subtotales de los ítems y repara las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='Corregir los totales que no coinciden')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Pedidos por lote de bulk_update (default: 1000)')
+
+    def handle(self, *args, **options):
+        # Un solo GROUP BY con HAVING: solo vuelven los pedidos descuadrados
+        mismatched = (
+            Order.objects
+            .annotate(items_total=Coalesce(
+                Sum('items__subtotal'),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ))
+            .exclude(total_amount=F('items_total'))
+            .values_list('id', 'total_amount', 'items_total')
+        )
+
+        batch = []
+        found = 0
+        for order_id, stored, expected in mismatched.iterator(chunk_size=options['batch_size']):
+            found += 1
+            self.stdout.write(f"Order {order_id}: total_amount={stored} expected={expected}")
+            if options['repair']:
+                # updated_at cambia el ETag y la clave de caché del detalle
+                batch.append(Order(id=order_id, total_amount=expected, updated_at=timezone.now()))
+                if len(batch) >= options['batch_size']:
+                    Order.objects.bulk_update(batch, ['total_amount', 'updated_at'])
+                    batch = []
+
+        if batch:
+            Order.objects.bulk_update(batch, ['total_amount', 'updated_at'])
+
+        action = 'repaired' if options['repair'] else 'found'
+        self.stdout.write(self.style.SUCCESS(f"{found} orders with mismatched totals {action}"))
@@ -3,12 +3,76 @@ Middleware for RBAC Authorization
 """
 import requests
 import time
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.http import JsonResponse
+from .auth_cache import TokenCache
+from .auth_session import get_auth_session, auth_timeout
+from .jwt_local import verify_token_local
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Caché de validaciones compartida por los decoradores (por proceso)
+token_cache = TokenCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL,
+    negative_ttl=settings.AUTH_CACHE_NEGATIVE_TTL,
+)
+
+
+def validate_token(token):
+    """
+    Validar el token usando la caché local y, si no está, el backend
+    configurado en AUTH_VALIDATION_MODE ('remote': Auth Service, 'local':
+    verificación RS256 contra el JWKS cacheado; si el JWKS no está
+    disponible o es inválido se valida con el Auth Service).
+    Devuelve (status_code, auth_data) con el formato del Auth Service.
+    Lanza OSError (p.ej. RequestException) si el backend no responde.
+    """
+    if settings.AUTH_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
+    if settings.AUTH_VALIDATION_MODE == 'local':
+        try:
+            status_code, auth_data = verify_token_local(token)
+        except OSError as e:
+            # JWKS no disponible o inválido: validar con el Auth Service
+            logger.warning(f"JWKS unavailable, falling back to auth service: {e}")
+            status_code, auth_data = _validate_remote(token)
+    else:
+        status_code, auth_data = _validate_remote(token)
+
+    # Solo se cachean respuestas definitivas (no errores 5xx del servicio)
+    if settings.AUTH_CACHE_ENABLED and status_code in (200, 401, 403):
+        valid = status_code == 200 and bool(auth_data.get('isValid'))
+        token_cache.set(token, (status_code, auth_data), valid)
+
+    return status_code, auth_data
+
+
+def _validate_remote(token):
+    """Validar el token llamando al Auth Service (sesión con pool keep-alive)"""
+    auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/v1/auth/validate"
+    response = get_auth_session().post(
+        auth_service_url,
+        json={'token': token},
+        timeout=auth_timeout()
+    )
+
+    auth_data = {}
+    if response.status_code == 200:
+        data = response.json()
+        auth_data = {
+            'isValid': data.get('isValid'),
+            'rol': data.get('rol'),
+            'userId': data.get('userId'),
+        }
+
+    return response.status_code, auth_data
+
 
 def require_gestor_role(view_func):
     """
@@ -30,25 +94,18 @@ def require_gestor_role(view_func):
         start_time = time.time()
         
         try:
-            # Llamar al Auth Service para validar el token
-            auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/v1/auth/validate"
-            response = requests.post(
-                auth_service_url,
-                json={'token': token},
-                timeout=5
-            )
+            # Validar el token (caché local o Auth Service)
+            status_code, auth_data = validate_token(token)
             
             validation_time = (time.time() - start_time) * 1000  # ms
             
-            if response.status_code != 200:
-                logger.warning(f"Token validation failed: {response.status_code}")
+            if status_code != 200:
+                logger.warning(f"Token validation failed: {status_code}")
                 return JsonResponse({
                     'error': 'Invalid or expired token',
                     'validation_time_ms': round(validation_time, 2)
                 }, status=401)
             
-            auth_data = response.json()
-            
             if not auth_data.get('isValid'):
                 return JsonResponse({
                     'error': 'Invalid token',
@@ -75,7 +132,8 @@ def require_gestor_role(view_func):
             # Continuar con la vista
             return view_func(request, *args, **kwargs)
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, OSError) as e:
+            # OSError: ni el JWKS ni el Auth Service están disponibles
             logger.error(f"Error calling auth service: {e}")
             return JsonResponse({
                 'error': 'Auth service unavailable',
@@ -102,15 +160,9 @@ def optional_auth(view_func):
             token = auth_header.replace('Bearer ', '')
             
             try:
-                auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/v1/auth/validate"
-                response = requests.post(
-                    auth_service_url,
-                    json={'token': token},
-                    timeout=5
-                )
+                status_code, auth_data = validate_token(token)
                 
-                if response.status_code == 200:
-                    auth_data = response.json()
+                if status_code == 200:
                     if auth_data.get('isValid'):
                         request.user_id = auth_data.get('userId')
                         request.user_rol = auth_data.get('rol')
@@ -121,3 +173,28 @@ def optional_auth(view_func):
     
     return wrapper
 
+
+def async_optional_auth(view_func):
+    """
+    Variante de optional_auth para vistas async: la validación (caché local,
+    Auth Service o JWKS) es síncrona y se ejecuta en el pool de hilos sin
+    bloquear el event loop.
+    """
+    async def wrapper(request, *args, **kwargs):
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        
+        if auth_header.startswith('Bearer '):
+            token = auth_header.replace('Bearer ', '')
+            
+            try:
+                status_code, auth_data = await sync_to_async(validate_token, thread_sensitive=False)(token)
+                
+                if status_code == 200 and auth_data.get('isValid'):
+                    request.user_id = auth_data.get('userId')
+                    request.user_rol = auth_data.get('rol')
+            except Exception as e:
+                logger.warning(f"Optional auth failed: {e}")
+        
+        return await view_func(request, *args, **kwargs)
+    
+    return wrapper
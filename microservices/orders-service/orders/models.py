@@ -1,7 +1,10 @@
 """
 Models for Orders Service
 """
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 
 
@@ -29,15 +32,34 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        indexes = [
+            # Paginación keyset de list_orders: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], name='orders_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='orders_status_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='orders_creator_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} - {self.customer_name}"
 
+    @staticmethod
+    def apply_total_delta(order_id, delta):
+        """Atomically add delta to the order total (no read of the items)"""
+        Order.objects.filter(pk=order_id).update(
+            total_amount=F('total_amount') + delta,
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def touch(order_ids):
+        """Bump updated_at of the orders (invalidates their detail ETag)"""
+        Order.objects.filter(pk__in=order_ids).update(updated_at=timezone.now())
+
     def calculate_total(self):
-        """Calculate total amount from order items"""
-        total = sum(item.subtotal for item in self.items.all())
+        """Calculate total amount from order items (single SUM aggregate)"""
+        total = self.items.aggregate(total=Sum('subtotal'))['total'] or Decimal('0')
         self.total_amount = total
-        self.save()
+        self.save(update_fields=['total_amount', 'updated_at'])
         return total
 
 
@@ -68,10 +90,61 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.product_sku} x{self.quantity} - {self.order.order_number}"
 
+    # Campos que afectan al subtotal (y por tanto al total del pedido)
+    PRICING_FIELDS = {'quantity', 'unit_price', 'subtotal'}
+
+    def compute_subtotal(self):
+        """
+        Calculate subtotal from quantity and unit price, with the price
+        rounded to cents first as the column stores it
+        """
+        self.unit_price = Decimal(str(self.unit_price)).quantize(Decimal('0.01'))
+        self.subtotal = (self.quantity * self.unit_price).quantize(Decimal('0.01'))
+        return self.subtotal
+
+    def _locked_subtotal(self):
+        """
+        Subtotal guardado de la fila, bloqueada hasta el final de la
+        transacción: dos escrituras concurrentes del mismo ítem calculan su
+        delta una después de la otra. None si la fila no existe.
+        """
+        if self.pk is None:
+            return None
+        return (
+            OrderItem.objects.select_for_update()
+            .filter(pk=self.pk).values_list('subtotal', flat=True).first()
+        )
+
     def save(self, *args, **kwargs):
-        """Calculate subtotal before saving"""
-        self.subtotal = self.quantity * self.unit_price
-        super().save(*args, **kwargs)
-        # Recalculate order total
-        self.order.calculate_total()
+        """
+        Calculate subtotal before saving and apply only the difference
+        to the order total. Status/notes-only updates (update_fields without
+        pricing fields) skip the total entirely.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.PRICING_FIELDS & set(update_fields):
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                # Sin cambio de total, pero el detalle del pedido sí cambió (ETag)
+                Order.touch([self.order_id])
+            return
+
+        self.compute_subtotal()
+
+        with transaction.atomic():
+            # El delta se calcula contra la fila actual, no contra la leída al cargar
+            delta = self.subtotal - (self._locked_subtotal() or Decimal('0'))
+            super().save(*args, **kwargs)
+            if delta:
+                Order.apply_total_delta(self.order_id, delta)
+            else:
+                Order.touch([self.order_id])
+
+    def delete(self, *args, **kwargs):
+        """Delete the item and subtract its subtotal from the order total"""
+        with transaction.atomic():
+            stored = self._locked_subtotal()
+            result = super().delete(*args, **kwargs)
+            Order.apply_total_delta(self.order_id, -(stored or Decimal('0')))
+        return result
 
@@ -0,0 +1,266 @@
+"""
+Pruebas de la caché de snapshots contra un Inventory Service simulado por HTTP
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from orders import inventory_snapshots, views
+from orders.inventory_snapshots import (
+    InventoryRejected, InventoryUnavailable, SnapshotCache, StockRejected, fetch_snapshots,
+    release_stock, reserve_stock
+)
+
+LOOKUP = '/api/v1/inventory/products/lookup?fields=sku%2Cname%2Cunit_price%2Cstock_quantity'
+RESERVE = '/api/v1/inventory/reservations'
+RELEASE = '/api/v1/inventory/reservations/release'
+
+
+class InventoryStub:
+    """
+    Servidor HTTP local con el lookup del inventario. Las respuestas de
+    otras rutas se programan en `scripted` como (status, payload, demora).
+    """
+
+    def __init__(self):
+        self.products = {}
+        self.versions = {}
+        self.status = 200
+        self.scripted = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append((self.path, body))
+                status = stub.status
+                if self.path in stub.scripted:
+                    status, payload, delay = stub.scripted[self.path].pop(0)
+                    time.sleep(delay)
+                elif stub.status != 200:
+                    payload = {'error': 'unavailable'}
+                else:
+                    found = [stub.products[sku] for sku in body['skus'] if sku in stub.products]
+                    payload = {
+                        'data': found,
+                        'missing': [sku for sku in body['skus'] if sku not in stub.products],
+                        'version': 1,
+                        'versions': {p['sku']: [1, stub.versions.get(p['sku'], 0)] for p in found},
+                    }
+                content = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente ya cerró la conexión por timeout
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def set_product(self, sku, stock, price=10.5, version=0):
+        self.products[sku] = {'sku': sku, 'name': f'Producto {sku}', 'unit_price': price, 'stock_quantity': stock}
+        self.versions[sku] = version
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class InventoryStubMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.stub = InventoryStub()
+        self.addCleanup(self.stub.stop)
+        settings_override = override_settings(
+            INVENTORY_SERVICE_URL=self.stub.url, INVENTORY_HTTP_RETRIES=0, INVENTORY_HTTP_TIMEOUT=2
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Sesiones nuevas para que tomen la configuración de la prueba
+        patcher = mock.patch.object(inventory_snapshots, '_sessions', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class FetchSnapshotsTests(InventoryStubMixin, SimpleTestCase):
+
+    def test_returns_snapshots_and_per_sku_versions(self):
+        self.stub.set_product('A', 5, price=10.5, version=3)
+        snapshots, versions = fetch_snapshots(['A', 'B'])
+        self.assertEqual(snapshots, {
+            'A': {'sku': 'A', 'name': 'Producto A', 'unit_price': Decimal('10.50'), 'stock_quantity': 5},
+        })
+        self.assertEqual(versions, {'A': (1, 3)})
+
+    def test_server_error_raises_unavailable(self):
+        self.stub.status = 503
+        with self.assertRaises(InventoryUnavailable):
+            fetch_snapshots(['A'])
+
+    def test_client_error_raises_rejected(self):
+        self.stub.scripted[LOOKUP] = [(400, {'error': 'skus must be a list of strings'}, 0)]
+        with self.assertRaises(InventoryRejected) as ctx:
+            fetch_snapshots([None])
+        self.assertEqual(ctx.exception.detail, 'skus must be a list of strings')
+
+
+class SnapshotCacheTests(InventoryStubMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.stub.set_product('A', 5)
+        self.stub.set_product('B', 7)
+        self.cache = SnapshotCache(ttl=30, stale_ttl=300, batch_size=500)
+
+    def age_entries(self, seconds, skus=None):
+        with self.cache._lock:
+            for sku, (snapshot, fetched_at, version) in self.cache._entries.items():
+                if skus is None or sku in skus:
+                    self.cache._entries[sku] = (snapshot, fetched_at - seconds, version)
+
+    def wait_for_refresh(self):
+        deadline = time.time() + 5
+        while self.cache.stats()['refreshing'] and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_missing_skus_fetched_in_one_lookup_then_served_locally(self):
+        result = self.cache.get_many(['A', 'B', 'C'])
+        self.assertEqual(sorted(result), ['A', 'B'])
+        self.assertEqual(len(self.stub.requests), 1)
+        self.cache.get_many(['A', 'B'])
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_stale_entry_served_and_refreshed_in_background(self):
+        self.cache.get_many(['A'])
+        self.age_entries(60)
+        self.stub.set_product('A', 1, version=1)
+
+        self.assertEqual(self.cache.get_many(['A'])['A']['stock_quantity'], 5)
+        self.wait_for_refresh()
+        self.assertEqual(self.cache.get_many(['A'])['A']['stock_quantity'], 1)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_refreshes_run_on_bounded_executor(self):
+        self.cache.get_many(['A', 'B'])
+        self.age_entries(60)
+        threads_before = threading.active_count()
+        for _ in range(20):
+            self.cache.get_many(['A', 'B'])
+        self.wait_for_refresh()
+        self.assertLessEqual(threading.active_count(), threads_before + self.cache.refresh_workers)
+        # Un SKU en refresco no se vuelve a encolar
+        self.assertLessEqual(len(self.stub.requests), 3)
+
+    def test_other_skus_stay_fresh_when_one_changes(self):
+        self.cache.get_many(['A', 'B'])
+        self.stub.set_product('A', 1, version=1)
+        self.age_entries(60, skus=['A'])
+        self.cache.get_many(['A'])
+        self.wait_for_refresh()
+        self.cache.get_many(['B'])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_older_response_does_not_replace_newer_entry(self):
+        self.stub.set_product('A', 1, version=2)
+        self.cache.get_many(['A'])
+        old = {'sku': 'A', 'name': 'Producto A', 'unit_price': Decimal('10.50'), 'stock_quantity': 5}
+        self.cache._store(['A'], {'A': old}, {'A': (1, 1)})
+        self.assertEqual(self.cache.get_many(['A'])['A']['stock_quantity'], 1)
+
+    def test_stale_if_error(self):
+        self.cache.get_many(['A'])
+        self.age_entries(1000)
+        self.stub.status = 503
+        self.assertEqual(self.cache.get_many(['A'])['A']['stock_quantity'], 5)
+        with self.assertRaises(InventoryUnavailable):
+            self.cache.get_many(['B'])
+
+
+class ReservationClientTests(InventoryStubMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(INVENTORY_HTTP_RETRIES=2, INVENTORY_HTTP_TIMEOUT=0.5)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_reserve_timeout_is_retried_with_same_reference(self):
+        self.stub.scripted[RESERVE] = [(200, {}, 1), (200, {'created': False}, 0)]
+        reserve_stock({'A': 2}, 'ORD-1')
+        self.assertEqual(self.stub.paths(), [RESERVE, RESERVE])
+        self.assertEqual({body['reference'] for _, body in self.stub.requests}, {'ORD-1'})
+
+    def test_failed_reserve_is_compensated_by_reference(self):
+        self.stub.scripted[RESERVE] = [(503, {}, 0)] * 3
+        self.stub.scripted[RELEASE] = [(404, {}, 0)]
+        with self.assertRaises(InventoryUnavailable):
+            reserve_stock({'A': 2}, 'ORD-1')
+        self.assertEqual(self.stub.requests[-1], (RELEASE, {'reference': 'ORD-1'}))
+
+    def test_reserve_rejected(self):
+        self.stub.scripted[RESERVE] = [(409, {'unknown': [], 'insufficient': ['A']}, 0)]
+        with self.assertRaises(StockRejected) as ctx:
+            reserve_stock({'A': 2}, 'ORD-1')
+        self.assertEqual(ctx.exception.insufficient, ['A'])
+        self.assertNotIn(RELEASE, self.stub.paths())
+
+    def test_release_of_inactive_reservation_is_not_an_error(self):
+        self.stub.scripted[RELEASE] = [(409, {'status': 'RELEASED'}, 0)]
+        release_stock('ORD-1')
+
+
+@override_settings(ORDERS_VALIDATE_INVENTORY=True, ORDERS_RESERVE_STOCK=True)
+class CreateOrderValidationTests(InventoryStubMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = APIRequestFactory()
+        patcher = mock.patch.object(views, 'snapshot_cache', SnapshotCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, items):
+        return views.create_order(self.factory.post('/orders', {'items': items}, format='json'))
+
+    def test_invalid_lines_rejected_before_calling_inventory(self):
+        for items in [
+            [{'quantity': 1}],
+            [{'product_sku': '', 'quantity': 1}],
+            [{'product_sku': 'A', 'quantity': 0}],
+            [{'product_sku': 'A', 'quantity': 'two'}],
+            [{'product_sku': 'A', 'quantity': 1.5}],
+            [{'product_sku': 'A', 'quantity': 1, 'unit_price': 'abc'}],
+            'A',
+        ]:
+            self.assertEqual(self.create(items).status_code, 400, items)
+        non_object = views.create_order(self.factory.post('/orders', [{'product_sku': 'A'}], format='json'))
+        self.assertEqual(non_object.status_code, 400)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_inventory_client_error_maps_to_400(self):
+        self.stub.set_product('A', 5)
+        self.stub.scripted[RESERVE] = [(400, {'error': 'At most 500 skus per reservation'}, 0)]
+        response = self.create([{'product_sku': 'A', 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'At most 500 skus per reservation')
+        self.assertNotIn(RELEASE, self.stub.paths())
@@ -0,0 +1,105 @@
+"""
+Pruebas de la validación local RS256 contra un JWKS servido desde archivo
+"""
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from django.test import SimpleTestCase, override_settings
+from orders import jwt_local, middleware
+from orders.jwt_local import JWKSCache, JWKSUnavailable
+
+AUDIENCE = 'https://api.provesi.test'
+DOMAIN = 'provesi.test'
+
+
+def make_keypair():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def make_jwk(private_key, kid):
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+    return jwk
+
+
+def make_token(private_key, kid, **claims):
+    payload = {
+        'sub': 'auth0|user-1',
+        'aud': AUDIENCE,
+        'iss': f'https://{DOMAIN}/',
+        'exp': int(time.time()) + 300,
+        'https://provesi.com/rol': 'GESTOR',
+    }
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+class JWKSFileMixin:
+    """JWKS en un archivo temporal, accesible por file://"""
+
+    def setUp(self):
+        super().setUp()
+        handle, self.jwks_path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.jwks_path)
+        self.jwks_url = f'file://{self.jwks_path}'
+
+    def write_jwks(self, content):
+        with open(self.jwks_path, 'w') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+
+@override_settings(AUTH0_AUDIENCE=AUDIENCE, AUTH0_DOMAIN=DOMAIN)
+class VerifyTokenLocalTests(JWKSFileMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.key = make_keypair()
+        self.write_jwks({'keys': [make_jwk(self.key, 'k1')]})
+        self.cache = JWKSCache(self.jwks_url, min_refresh_interval=0)
+        self.cache._start_refresher = lambda: None
+        patcher = mock.patch.object(jwt_local, 'get_jwks_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_valid_token(self):
+        status_code, auth_data = jwt_local.verify_token_local(make_token(self.key, 'k1'))
+        self.assertEqual(status_code, 200)
+        self.assertEqual(auth_data, {'isValid': True, 'rol': 'GESTOR', 'userId': 'auth0|user-1'})
+
+    def test_rejects_wrong_audience_and_expired_token(self):
+        self.assertEqual(jwt_local.verify_token_local(make_token(self.key, 'k1', aud='other'))[0], 401)
+        expired = make_token(self.key, 'k1', exp=int(time.time()) - 10)
+        self.assertEqual(jwt_local.verify_token_local(expired)[0], 401)
+
+    def test_rejects_token_signed_with_other_key(self):
+        forged = make_token(make_keypair(), 'k1')
+        self.assertEqual(jwt_local.verify_token_local(forged)[0], 401)
+
+    def test_unknown_kid_refreshes_jwks(self):
+        self.cache.refresh()
+        rotated = make_keypair()
+        self.write_jwks({'keys': [make_jwk(self.key, 'k1'), make_jwk(rotated, 'k2')]})
+        self.assertEqual(jwt_local.verify_token_local(make_token(rotated, 'k2'))[0], 200)
+
+    def test_malformed_jwks_raises_unavailable(self):
+        for content in ['not json', '[]', {'keys': [{'kty': 'RSA', 'kid': 'k1', 'n': 'x'}]}]:
+            self.write_jwks(content)
+            with self.assertRaises(JWKSUnavailable):
+                self.cache.refresh()
+
+
+@override_settings(AUTH_VALIDATION_MODE='local', AUTH_CACHE_ENABLED=False)
+class ValidateTokenFallbackTests(SimpleTestCase):
+
+    def test_falls_back_to_remote_when_jwks_unavailable(self):
+        remote = (200, {'isValid': True, 'rol': 'OPERARIO', 'userId': 'u1'})
+        with mock.patch.object(middleware, 'verify_token_local', side_effect=JWKSUnavailable('bad')), \
+                mock.patch.object(middleware, '_validate_remote', return_value=remote) as validate_remote:
+            self.assertEqual(middleware.validate_token('token'), remote)
+        validate_remote.assert_called_once_with('token')
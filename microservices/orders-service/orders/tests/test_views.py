@@ -0,0 +1,45 @@
+"""
+Pruebas de validación de las vistas de pedidos (sin base de datos)
+"""
+from decimal import Decimal
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from orders import middleware, views
+from orders.models import OrderItem
+
+GESTOR = (200, {'isValid': True, 'rol': 'GESTOR', 'userId': 'auth0|gestor'})
+
+
+@override_settings(AUTH_CACHE_ENABLED=False)
+class BatchUpdateValidationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        patcher = mock.patch.object(middleware, 'validate_token', return_value=GESTOR)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def put(self, body):
+        request = self.factory.put('/orders/items/batch', body, format='json', HTTP_AUTHORIZATION='Bearer token')
+        return views.batch_update_item_status(request)
+
+    def test_rejects_non_object_body(self):
+        response = self.put([{'item_id': 1, 'status': 'UNAVAILABLE'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'body must be a JSON object')
+
+    def test_rejects_empty_items(self):
+        self.assertEqual(self.put({'items': []}).status_code, 400)
+
+
+class OrderItemPricingTests(SimpleTestCase):
+
+    def test_unit_price_rounded_before_subtotal(self):
+        item = OrderItem(quantity=2, unit_price=Decimal('2.005'))
+        self.assertEqual(item.compute_subtotal(), Decimal('4.00'))
+        self.assertEqual(item.unit_price * item.quantity, item.subtotal)
+
+    def test_parsed_prices_are_rounded_to_cents(self):
+        [item] = views._parse_order_items([{'product_sku': 'A', 'quantity': 2, 'unit_price': '2.005'}])
+        self.assertEqual(item.unit_price, Decimal('2.00'))
@@ -2,12 +2,24 @@
 Views for Orders Service
 """
 import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import Order, OrderItem
-from .middleware import require_gestor_role, optional_auth
+from .middleware import require_gestor_role, optional_auth, token_cache
+from .auth_session import pool_stats
+from .inventory_snapshots import (
+    InventoryRejected, InventoryUnavailable, StockRejected, release_stock, reserve_stock, snapshot_cache
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,44 +30,165 @@ def health_check(request):
     """Health check endpoint"""
     return Response({
         'status': 'ok',
-        'service': 'orders-service'
+        'service': 'orders-service',
+        'auth_cache': token_cache.stats(),
+        'auth_pool': pool_stats(),
+        'inventory_snapshots': snapshot_cache.stats()
     })
 
 
+def _parse_order_items(items_data):
+    """
+    Validar las líneas del pedido y construir los OrderItem en memoria.
+    Lanza ValueError si alguna línea no tiene SKU, cantidad entera >= 1 o
+    precio numérico.
+    """
+    if not isinstance(items_data, list):
+        raise ValueError('items must be a list')
+    items = []
+    for index, item_data in enumerate(items_data):
+        if not isinstance(item_data, dict):
+            raise ValueError(f'Item {index} must be an object')
+        sku = item_data.get('product_sku')
+        if not isinstance(sku, str) or not sku.strip():
+            raise ValueError(f'Item {index} needs a product_sku')
+        quantity = item_data.get('quantity', 1)
+        if isinstance(quantity, bool) or (isinstance(quantity, float) and not quantity.is_integer()):
+            raise ValueError(f'Invalid quantity for {sku}')
+        try:
+            quantity = int(quantity)
+            unit_price = Decimal(str(item_data.get('unit_price', 0)))
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid quantity for {sku}')
+        except InvalidOperation:
+            raise ValueError(f'Invalid unit_price for {sku}')
+        if quantity < 1:
+            raise ValueError(f'Invalid quantity for {sku}')
+        if not unit_price.is_finite():
+            raise ValueError(f'Invalid unit_price for {sku}')
+        try:
+            # Al céntimo, como lo guarda la columna: subtotal = cantidad * precio guardado
+            unit_price = unit_price.quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError(f'Invalid unit_price for {sku}')
+        items.append(OrderItem(
+            product_sku=sku.strip(),
+            product_name=item_data.get('product_name'),
+            quantity=quantity,
+            unit_price=unit_price,
+        ))
+    return items
+
+
 @api_view(['POST'])
 def create_order(request):
     """
     Crear un nuevo pedido
     No requiere rol específico (cualquier usuario autenticado puede crear pedidos)
+
+    Con ORDERS_VALIDATE_INVENTORY los SKUs se validan contra el inventario y
+    el nombre y precio de cada línea salen de la caché de snapshots, no del
+    cliente. Con ORDERS_RESERVE_STOCK el stock se reserva (todo o nada)
+    antes de guardar el pedido y se devuelve si el pedido no se guarda.
+    Las líneas se validan antes de llamar al inventario (400).
     """
+    if not isinstance(request.data, dict):
+        return Response({
+            'error': 'body must be a JSON object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         data = request.data
         
+        try:
+            items = _parse_order_items(data.get('items', []))
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Generar número de orden único
         import uuid
         order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
         
-        order = Order.objects.create(
-            order_number=order_number,
-            customer_name=data.get('customer_name', ''),
-            customer_email=data.get('customer_email', ''),
-            customer_company=data.get('customer_company', ''),
-            notes=data.get('notes', ''),
-            created_by=getattr(request, 'user_id', None)
-        )
-        
-        # Crear ítems del pedido
-        items_data = data.get('items', [])
-        for item_data in items_data:
-            OrderItem.objects.create(
-                order=order,
-                product_sku=item_data.get('product_sku'),
-                product_name=item_data.get('product_name'),
-                quantity=item_data.get('quantity', 1),
-                unit_price=item_data.get('unit_price', 0),
-            )
+        snapshots = None
+        if settings.ORDERS_VALIDATE_INVENTORY and items:
+            skus = [item.product_sku for item in items]
+            try:
+                snapshots = snapshot_cache.get_many(skus)
+            except InventoryRejected as e:
+                return Response({
+                    'error': 'Invalid order items',
+                    'detail': e.detail
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except InventoryUnavailable as e:
+                logger.error(f"Inventory unavailable creating order: {e}")
+                return Response({
+                    'error': 'Inventory service unavailable'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            unknown = [sku for sku in skus if sku not in snapshots]
+            if unknown:
+                return Response({
+                    'error': 'Unknown product SKUs',
+                    'skus': unknown
+                }, status=status.HTTP_400_BAD_REQUEST)
         
-        order.calculate_total()
+        # Ítems ya construidos en memoria: precios del inventario y total una sola vez
+        for item in items:
+            if snapshots is not None:
+                snapshot = snapshots[item.product_sku]
+                item.product_name = snapshot['name']
+                item.unit_price = snapshot['unit_price']
+            item.compute_subtotal()
+        total = sum((item.subtotal for item in items), Decimal('0')).quantize(Decimal('0.01'))
+        
+        quantities = {}
+        if settings.ORDERS_RESERVE_STOCK:
+            for item in items:
+                quantities[item.product_sku] = quantities.get(item.product_sku, 0) + item.quantity
+        if quantities:
+            try:
+                reserve_stock(quantities, order_number)
+            except StockRejected as e:
+                return Response({
+                    'error': 'Insufficient stock',
+                    'unknown': e.unknown,
+                    'insufficient': e.insufficient
+                }, status=status.HTTP_409_CONFLICT)
+            except InventoryRejected as e:
+                return Response({
+                    'error': 'Invalid order items',
+                    'detail': e.detail
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except InventoryUnavailable as e:
+                logger.error(f"Inventory unavailable reserving stock: {e}")
+                return Response({
+                    'error': 'Inventory service unavailable'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        # Un INSERT del pedido (ya con su total) y un INSERT masivo de ítems
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_number=order_number,
+                    customer_name=data.get('customer_name', ''),
+                    customer_email=data.get('customer_email', ''),
+                    customer_company=data.get('customer_company', ''),
+                    notes=data.get('notes', ''),
+                    total_amount=total,
+                    created_by=getattr(request, 'user_id', None) or ''
+                )
+                for item in items:
+                    item.order = order
+                OrderItem.objects.bulk_create(items)
+        except Exception:
+            if quantities:
+                # Compensar la reserva: el pedido no se guardó
+                try:
+                    release_stock(order_number)
+                except InventoryUnavailable as e:
+                    logger.error(f"Could not release stock for {order_number}: {e}")
+            raise
         
         return Response({
             'id': order.id,
@@ -72,42 +205,69 @@ def create_order(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+ORDER_DETAIL_FIELDS = [
+    'id', 'order_number', 'customer_name', 'customer_email', 'customer_company',
+    'status', 'total_amount', 'notes', 'created_at', 'updated_at',
+]
+
+ORDER_ITEM_FIELDS = [
+    'id', 'product_sku', 'product_name', 'quantity', 'unit_price', 'subtotal', 'status', 'notes',
+]
+
+
+def _order_etag(order_id, updated_at):
+    """ETag del detalle: cambia con updated_at del pedido (cualquier cambio de ítems lo actualiza)"""
+    return f'"{order_id}-{int(updated_at.timestamp() * 1000000)}"'
+
+
+def _order_cache_key(order_id, updated_at):
+    return f"order_detail:{order_id}:{updated_at.timestamp()}"
+
+
+def order_payload(order, items):
+    """Detalle serializable de un pedido a partir de las filas .values() del pedido y sus ítems"""
+    for item in items:
+        item['unit_price'] = str(item['unit_price'])
+        item['subtotal'] = str(item['subtotal'])
+    
+    payload = dict(order)
+    payload['total_amount'] = str(order['total_amount'])
+    payload['items'] = items
+    payload['created_at'] = order['created_at'].isoformat()
+    payload['updated_at'] = order['updated_at'].isoformat()
+    return payload
+
+
 @api_view(['GET'])
 @optional_auth
 def get_order(request, order_id):
     """
     Obtener detalles de un pedido
     Permite acceso a ambos roles (GESTOR y OPERARIO) para lectura
+
+    Responde 304 Not Modified si If-None-Match coincide con el ETag actual;
+    el detalle se guarda en caché por versión (id + updated_at).
     """
     try:
-        order = get_object_or_404(Order, id=order_id)
-        
-        items = []
-        for item in order.items.all():
-            items.append({
-                'id': item.id,
-                'product_sku': item.product_sku,
-                'product_name': item.product_name,
-                'quantity': item.quantity,
-                'unit_price': str(item.unit_price),
-                'subtotal': str(item.subtotal),
-                'status': item.status,
-                'notes': item.notes,
-            })
+        order = Order.objects.filter(id=order_id).values(*ORDER_DETAIL_FIELDS).first()
+        if order is None:
+            return Response({
+                'error': 'Order not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        return Response({
-            'id': order.id,
-            'order_number': order.order_number,
-            'customer_name': order.customer_name,
-            'customer_email': order.customer_email,
-            'customer_company': order.customer_company,
-            'status': order.status,
-            'total_amount': str(order.total_amount),
-            'notes': order.notes,
-            'items': items,
-            'created_at': order.created_at.isoformat(),
-            'updated_at': order.updated_at.isoformat(),
-        })
+        etag = _order_etag(order_id, order['updated_at'])
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        cache_key = _order_cache_key(order_id, order['updated_at'])
+        payload = cache.get(cache_key) if settings.ORDERS_DETAIL_CACHE_TTL else None
+        if payload is None:
+            items = list(OrderItem.objects.filter(order_id=order_id).values(*ORDER_ITEM_FIELDS))
+            payload = order_payload(order, items)
+            if settings.ORDERS_DETAIL_CACHE_TTL:
+                cache.set(cache_key, payload, settings.ORDERS_DETAIL_CACHE_TTL)
+        
+        return Response(payload, headers={'ETag': etag})
     
     except Exception as e:
         logger.error(f"Error getting order: {e}")
@@ -126,8 +286,7 @@ def update_item_status(request, order_id, item_id):
     start_time = time.time()
     
     try:
-        order = get_object_or_404(Order, id=order_id)
-        item = get_object_or_404(OrderItem, id=item_id, order=order)
+        item = get_object_or_404(OrderItem, id=item_id, order_id=order_id)
         
         new_status = request.data.get('status')
         notes = request.data.get('notes', '')
@@ -140,7 +299,8 @@ def update_item_status(request, order_id, item_id):
         item.status = new_status
         if notes:
             item.notes = notes
-        item.save()
+        # Solo cambia estado/notas: el total del pedido no se recalcula
+        item.save(update_fields=['status', 'notes', 'updated_at'])
         
         elapsed_time = (time.time() - start_time) * 1000
         
@@ -161,6 +321,115 @@ def update_item_status(request, order_id, item_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _parse_item_id(change):
+    """item_id de un cambio del lote como entero, o None si no es válido"""
+    if not isinstance(change, dict):
+        return None
+    item_id = change.get('item_id')
+    if isinstance(item_id, bool) or (isinstance(item_id, float) and not item_id.is_integer()):
+        return None
+    try:
+        return int(item_id)
+    except (TypeError, ValueError):
+        return None
+
+
+@api_view(['PUT'])
+@require_gestor_role
+def batch_update_item_status(request, order_id=None):
+    """
+    Cambiar el estado de varios ítems en una sola llamada
+    Body: {"items": [{"item_id": 1, "status": "UNAVAILABLE", "notes": "..."}]}
+    Con order_id en la URL solo se aceptan ítems de ese pedido.
+    REQUIERE ROL: GESTOR
+    """
+    start_time = time.time()
+    
+    if not isinstance(request.data, dict):
+        return Response({
+            'error': 'body must be a JSON object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        changes = request.data.get('items')
+        if not isinstance(changes, list) or not changes:
+            return Response({
+                'error': 'items must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(changes) > settings.ORDERS_BATCH_MAX_ITEMS:
+            return Response({
+                'error': f'Too many items. Maximum is {settings.ORDERS_BATCH_MAX_ITEMS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        valid_statuses = dict(OrderItem.ITEM_STATUS)
+        item_ids = [_parse_item_id(change) for change in changes]
+        
+        # Una sola consulta para todos los ítems
+        items = OrderItem.objects.filter(id__in=[item_id for item_id in item_ids if item_id is not None])
+        if order_id is not None:
+            items = items.filter(order_id=order_id)
+        items = {item.id: item for item in items}
+        
+        now = timezone.now()
+        results = []
+        to_update = []
+        for change, item_id in zip(changes, item_ids):
+            if item_id is None:
+                results.append({
+                    'item_id': change.get('item_id') if isinstance(change, dict) else None,
+                    'updated': False,
+                    'error': 'Invalid item_id'
+                })
+                continue
+            item = items.get(item_id)
+            if item is None:
+                results.append({'item_id': item_id, 'updated': False, 'error': 'Item not found'})
+                continue
+            new_status = change.get('status')
+            if new_status not in valid_statuses:
+                results.append({
+                    'item_id': item_id,
+                    'updated': False,
+                    'error': f'Invalid status. Must be one of: {list(valid_statuses.keys())}'
+                })
+                continue
+            
+            item.status = new_status
+            if change.get('notes'):
+                item.notes = change['notes']
+            item.updated_at = now
+            to_update.append(item)
+            results.append({
+                'item_id': item_id,
+                'order_id': item.order_id,
+                'updated': True,
+                'status': item.status,
+                'notes': item.notes,
+            })
+        
+        # Solo estado/notas: un UPDATE masivo, sin recalcular totales
+        if to_update:
+            with transaction.atomic():
+                OrderItem.objects.bulk_update(to_update, ['status', 'notes', 'updated_at'])
+                Order.touch({item.order_id for item in to_update})
+        
+        elapsed_time = (time.time() - start_time) * 1000
+        
+        return Response({
+            'results': results,
+            'updated': len(to_update),
+            'failed': len(results) - len(to_update),
+            'elapsed_time_ms': round(elapsed_time, 2),
+            'validation_time_ms': getattr(request, 'validation_time_ms', 0)
+        }, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        logger.error(f"Error in batch item status update: {e}")
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['DELETE'])
 @require_gestor_role
 def delete_item(request, order_id, item_id):
@@ -171,11 +440,10 @@ def delete_item(request, order_id, item_id):
     start_time = time.time()
     
     try:
-        order = get_object_or_404(Order, id=order_id)
-        item = get_object_or_404(OrderItem, id=item_id, order=order)
+        item = get_object_or_404(OrderItem, id=item_id, order_id=order_id)
         
+        # delete() descuenta el subtotal del total del pedido
         item.delete()
-        order.calculate_total()
         
         elapsed_time = (time.time() - start_time) * 1000
         
@@ -192,27 +460,101 @@ def delete_item(request, order_id, item_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _parse_order_cursor(value):
+    """Leer ?after=<created_at,id>; lanza ValueError si no es válido"""
+    created_at, _, order_id = value.rpartition(',')
+    parsed = parse_datetime(created_at)
+    if parsed is None or not order_id.isdigit():
+        raise ValueError('after must have the form <created_at,id>')
+    return parsed, int(order_id)
+
+
+def _parse_date_filter(value, name, end_of_day=False):
+    """
+    Fecha u hora ISO 8601 para los filtros de rango. Con end_of_day una
+    fecha sin hora se toma como el inicio del día siguiente (límite exclusivo
+    que incluye todo ese día).
+    """
+    # Primero la fecha: parse_datetime también acepta 'YYYY-MM-DD' (medianoche)
+    day = parse_date(value)
+    if day is not None:
+        if end_of_day:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, datetime.min.time())
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _format_order_cursor(created_at, order_id):
+    # 'Z' en lugar de '+00:00' para que el cursor no dependa de codificar el '+'
+    return f"{created_at.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')},{order_id}"
+
+
 @api_view(['GET'])
 @optional_auth
 def list_orders(request):
-    """Listar todos los pedidos"""
+    """
+    Listar pedidos con paginación keyset sobre (created_at, id)
+    Filtros: ?status=, ?created_by=, ?created_from=, ?created_to=
+    ?after=<created_at,id> continúa desde el cursor next_after;
+    ?include_counts=true agrega item_count y unavailable_count.
+    """
     try:
-        orders = Order.objects.all()[:50]  # Limit to 50 for demo
-        
-        orders_data = []
-        for order in orders:
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer_name': order.customer_name,
-                'status': order.status,
-                'total_amount': str(order.total_amount),
-                'created_at': order.created_at.isoformat(),
-            })
+        params = request.GET
+        try:
+            limit = int(params.get('limit', settings.ORDERS_PAGE_SIZE))
+            if limit < 1:
+                raise ValueError('limit must be a positive integer')
+            limit = min(limit, settings.ORDERS_MAX_PAGE_SIZE)
+            
+            orders = Order.objects.all()
+            if params.get('status'):
+                orders = orders.filter(status=params['status'])
+            if params.get('created_by'):
+                orders = orders.filter(created_by=params['created_by'])
+            if params.get('created_from'):
+                orders = orders.filter(created_at__gte=_parse_date_filter(params['created_from'], 'created_from'))
+            if params.get('created_to'):
+                orders = orders.filter(created_at__lt=_parse_date_filter(params['created_to'], 'created_to', end_of_day=True))
+            if params.get('after'):
+                created_at, order_id = _parse_order_cursor(params['after'])
+                orders = orders.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+                )
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fields = ['id', 'order_number', 'customer_name', 'status', 'total_amount', 'created_at']
+        if params.get('include_counts') == 'true':
+            # Conteos calculados en la misma consulta (LEFT JOIN + GROUP BY)
+            orders = orders.annotate(
+                item_count=Count('items'),
+                unavailable_count=Count('items', filter=Q(items__status='UNAVAILABLE')),
+            )
+            fields += ['item_count', 'unavailable_count']
+        
+        orders_data = list(orders.order_by('-created_at', '-id').values(*fields)[:limit])
+        
+        next_after = None
+        if len(orders_data) == limit:
+            last = orders_data[-1]
+            next_after = _format_order_cursor(last['created_at'], last['id'])
+        
+        for row in orders_data:
+            row['total_amount'] = str(row['total_amount'])
+            row['created_at'] = row['created_at'].isoformat()
         
         return Response({
             'orders': orders_data,
-            'count': len(orders_data)
+            'count': len(orders_data),
+            'next_after': next_after
         })
     
     except Exception as e:
@@ -220,4 +562,3 @@ def list_orders(request):
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
@@ -102,6 +102,49 @@ REST_FRAMEWORK = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Paginación keyset de list_orders (?after=<created_at,id>&limit=)
+ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', '50'))
+ORDERS_MAX_PAGE_SIZE = int(os.getenv('ORDERS_MAX_PAGE_SIZE', '200'))
+
+# Caché del detalle de pedido (segundos, 0 = deshabilitada). Usa el backend de CACHES
+ORDERS_DETAIL_CACHE_TTL = int(os.getenv('ORDERS_DETAIL_CACHE_TTL', '60'))
+
+# Máximo de ítems por llamada al endpoint de actualización en lote
+ORDERS_BATCH_MAX_ITEMS = int(os.getenv('ORDERS_BATCH_MAX_ITEMS', '1000'))
+
+# Inventory Service: validación y precios de las líneas de create_order
+INVENTORY_SERVICE_URL = os.getenv('INVENTORY_SERVICE_URL', 'http://localhost:8000')
+ORDERS_VALIDATE_INVENTORY = os.getenv('ORDERS_VALIDATE_INVENTORY', 'False') == 'True'
+ORDERS_RESERVE_STOCK = os.getenv('ORDERS_RESERVE_STOCK', 'False') == 'True'
+INVENTORY_HTTP_POOL_SIZE = int(os.getenv('INVENTORY_HTTP_POOL_SIZE', '20'))
+INVENTORY_HTTP_RETRIES = int(os.getenv('INVENTORY_HTTP_RETRIES', '2'))
+INVENTORY_HTTP_TIMEOUT = float(os.getenv('INVENTORY_HTTP_TIMEOUT', '5'))
+
+# Caché local de snapshots por SKU (entradas / segundos frescos / segundos servibles vencidos)
+INVENTORY_SNAPSHOT_MAX_SIZE = int(os.getenv('INVENTORY_SNAPSHOT_MAX_SIZE', '10000'))
+INVENTORY_SNAPSHOT_TTL = int(os.getenv('INVENTORY_SNAPSHOT_TTL', '30'))
+INVENTORY_SNAPSHOT_STALE_TTL = int(os.getenv('INVENTORY_SNAPSHOT_STALE_TTL', '300'))
+INVENTORY_SNAPSHOT_REFRESH_WORKERS = int(os.getenv('INVENTORY_SNAPSHOT_REFRESH_WORKERS', '1'))
+
 # Auth Service Configuration (for RBAC)
 AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://localhost:3000')
 
+# Pool HTTP hacia el Auth Service (conexiones, reintentos, timeouts en segundos)
+AUTH_HTTP_POOL_SIZE = int(os.getenv('AUTH_HTTP_POOL_SIZE', '20'))
+AUTH_HTTP_RETRIES = int(os.getenv('AUTH_HTTP_RETRIES', '2'))
+AUTH_HTTP_BACKOFF = float(os.getenv('AUTH_HTTP_BACKOFF', '0.1'))
+AUTH_HTTP_CONNECT_TIMEOUT = float(os.getenv('AUTH_HTTP_CONNECT_TIMEOUT', '2'))
+AUTH_HTTP_READ_TIMEOUT = float(os.getenv('AUTH_HTTP_READ_TIMEOUT', '5'))
+
+# Validación de tokens: 'remote' (Auth Service) o 'local' (RS256 contra JWKS cacheado)
+AUTH_VALIDATION_MODE = os.getenv('AUTH_VALIDATION_MODE', 'remote')
+AUTH0_DOMAIN = os.getenv('AUTH0_DOMAIN', '')
+AUTH0_AUDIENCE = os.getenv('AUTH0_AUDIENCE', '')
+AUTH_JWKS_URL = os.getenv('AUTH_JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+AUTH_JWKS_REFRESH_INTERVAL = int(os.getenv('AUTH_JWKS_REFRESH_INTERVAL', '600'))
+
+# Caché local de validaciones de token (segundos / entradas)
+AUTH_CACHE_ENABLED = os.getenv('AUTH_CACHE_ENABLED', 'True') == 'True'
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '300'))
+AUTH_CACHE_NEGATIVE_TTL = int(os.getenv('AUTH_CACHE_NEGATIVE_TTL', '10'))
+AUTH_CACHE_MAX_SIZE = int(os.getenv('AUTH_CACHE_MAX_SIZE', '10000'))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Benchmark WSGI vs ASGI de las vistas de lectura
+
+Lanza N conexiones keep-alive concurrentes contra la vista síncrona (WSGI,
+p.ej. gunicorn) y su equivalente async (ASGI, uvicorn) y compara
+peticiones/s y latencias p50/p99 para cada nivel de concurrencia.
+Solo usa la librería estándar (asyncio + HTTP/1.1), sin dependencias.
+
+Para 1000 conexiones puede hacer falta subir el límite de descriptores
+(ulimit -n 4096). Desactivar la caché de lecturas del inventario
+(INVENTORY_CACHE_ENABLED=False) para medir la consulta y no la caché.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+# Endpoint -> (ruta WSGI, ruta ASGI)
+ENDPOINTS = {
+    'nosql-list': ('/api/v1/inventory/nosql-list?limit=100&profile=summary',
+                   '/api/v1/async/inventory/nosql-list?limit=100&profile=summary'),
+    'stats': ('/api/v1/inventory/stats', '/api/v1/async/inventory/stats'),
+    'health': ('/api/v1/health', '/api/v1/async/health'),
+    'order': ('/api/v1/orders/{order_id}', '/api/v1/async/orders/{order_id}'),
+}
+
+
+async def read_response(reader):
+    """Leer una respuesta HTTP/1.1 completa; devuelve (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    version, status = status_line.split()[:2]
+    status = int(status)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        # Sin longitud: el cuerpo termina al cerrar la conexión
+        await reader.read()
+        return status, False
+
+    if version == b'HTTP/1.0':
+        return status, headers.get('connection') == 'keep-alive'
+    return status, headers.get('connection') != 'close'
+
+
+async def worker(url, deadline, latencies, counters, timeout):
+    """Una conexión keep-alive que repite la petición hasta el deadline"""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+    reader = writer = None
+
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(parts.hostname, parts.port or 80), timeout
+                )
+            start = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            if status < 400:
+                latencies.append(time.perf_counter() - start)
+            else:
+                counters['errors'] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            counters['errors'] += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.05)
+
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_level(url, concurrency, duration, warmup, timeout):
+    """Carga con `concurrency` conexiones; las muestras del warmup se descartan"""
+    if warmup:
+        await asyncio.gather(*[
+            worker(url, time.perf_counter() + warmup, [], {'errors': 0}, timeout)
+            for _ in range(concurrency)
+        ])
+
+    latencies = []
+    counters = {'errors': 0}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        worker(url, start + duration, latencies, counters, timeout)
+        for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': counters['errors'],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def print_comparison(endpoint, results):
+    print("\n" + "=" * 72)
+    print(f"📊 RESULTADOS: {endpoint}")
+    print("=" * 72)
+    print(f"{'Conexiones':>10}  {'Servidor':<6} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errores':>8}")
+    print("-" * 72)
+    for level in sorted({r['concurrency'] for r in results}):
+        rows = {r['server']: r for r in results if r['concurrency'] == level}
+        for server in ('WSGI', 'ASGI'):
+            if server in rows:
+                r = rows[server]
+                print(f"{level:>10}  {server:<6} {r['rps']:>10.1f} {r['p50_ms']:>10.2f} "
+                      f"{r['p99_ms']:>10.2f} {r['errors']:>8}")
+        if len(rows) == 2 and rows['WSGI']['rps']:
+            print(f"{'':>10}  ⚡ ASGI/WSGI: {rows['ASGI']['rps'] / rows['WSGI']['rps']:.2f}x req/s")
+
+
+async def main(args):
+    wsgi_path, asgi_path = (p.format(order_id=args.order_id) for p in ENDPOINTS[args.endpoint])
+    targets = []
+    if args.wsgi_url:
+        targets.append(('WSGI', args.wsgi_url.rstrip('/') + wsgi_path))
+    if args.asgi_url:
+        targets.append(('ASGI', args.asgi_url.rstrip('/') + asgi_path))
+
+    results = []
+    for concurrency in args.concurrency:
+        for server, url in targets:
+            print(f"🚀 {server} {url} - {concurrency} conexiones, {args.duration}s...")
+            result = await run_level(url, concurrency, args.duration, args.warmup, args.timeout)
+            result['server'] = server
+            print(f"   {result['rps']:.1f} req/s, p99 {result['p99_ms']:.2f} ms, errores: {result['errors']}")
+            results.append(result)
+
+    print_comparison(args.endpoint, results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'endpoint': args.endpoint, 'results': results}, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Comparar vistas WSGI y ASGI (req/s y p99) bajo carga concurrente')
+    parser.add_argument('--endpoint', choices=list(ENDPOINTS), default='nosql-list',
+                        help='Vista a medir (default: nosql-list)')
+    parser.add_argument('--wsgi-url', default='http://localhost:8000',
+                        help='URL base del servicio servido por WSGI (vacío para omitir)')
+    parser.add_argument('--asgi-url', default='http://localhost:8010',
+                        help='URL base del servicio servido por ASGI/uvicorn (vacío para omitir)')
+    parser.add_argument('--concurrency', default='100,500,1000',
+                        type=lambda value: [int(v) for v in value.split(',') if v.strip()],
+                        help='Niveles de conexiones concurrentes separados por coma (default: 100,500,1000)')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Segundos de medición por nivel (default: 30)')
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='Segundos de calentamiento descartados por nivel (default: 3)')
+    parser.add_argument('--timeout', type=float, default=10,
+                        help='Timeout por petición en segundos (default: 10)')
+    parser.add_argument('--order-id', type=int, default=1,
+                        help='Pedido a leer con --endpoint order (default: 1)')
+    parser.add_argument('--output', help='Guardar los resultados en un archivo JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
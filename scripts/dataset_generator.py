@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Generador determinista de datasets de inventario (sin Faker)
+
+Para una semilla y un tamaño dados produce exactamente los mismos productos
+en cada ejecución, de modo que los números de sql-list vs nosql-list sean
+comparables entre versiones. Los valores salen de vocabularios fijos y se
+generan por bloques con elecciones aleatorias en lote.
+
+Uso (exportar a CSV para verificar reproducibilidad):
+    python dataset_generator.py --seed 42 --products 100000 --output dataset.csv
+"""
+import sys
+import csv
+import random
+import hashlib
+import argparse
+from decimal import Decimal
+
+# Categorías de productos de seguridad
+CATEGORIES = [
+    'Guantes de Seguridad',
+    'Señalizaciones',
+    'Cascos de Protección',
+    'Gafas de Seguridad',
+    'Calzado de Seguridad',
+    'Chalecos Reflectantes',
+    'Extintores',
+    'Botiquines',
+    'Cintas de Seguridad',
+    'Conos de Tráfico'
+]
+
+# Tipos de productos por categoría
+PRODUCT_TYPES = {
+    'Guantes de Seguridad': ['Guantes Nitrilo', 'Guantes Látex', 'Guantes Cuero', 'Guantes Anticorte'],
+    'Señalizaciones': ['Señal Prohibido', 'Señal Advertencia', 'Señal Obligatorio', 'Señal Información'],
+    'Cascos de Protección': ['Casco Clase A', 'Casco Clase B', 'Casco Clase C', 'Casco con Visera'],
+    'Gafas de Seguridad': ['Gafas Anti-Vaho', 'Gafas Anti-Rayos UV', 'Gafas de Seguridad Básicas'],
+    'Calzado de Seguridad': ['Botas de Seguridad', 'Zapatos de Seguridad', 'Botas Impermeables'],
+    'Chalecos Reflectantes': ['Chaleco Clase 2', 'Chaleco Clase 3', 'Chaleco con Bolsillos'],
+    'Extintores': ['Extintor ABC', 'Extintor CO2', 'Extintor Agua', 'Extintor Polvo'],
+    'Botiquines': ['Botiquín Básico', 'Botiquín Completo', 'Botiquín Industrial'],
+    'Cintas de Seguridad': ['Cinta Amarilla', 'Cinta Roja', 'Cinta Blanca', 'Cinta Reflectante'],
+    'Conos de Tráfico': ['Cono 45cm', 'Cono 60cm', 'Cono 75cm', 'Cono con Luz']
+}
+
+# Vocabularios fijos (sustituyen a fake.word(), fake.text() y fake.company())
+NAME_WORDS = [
+    'Pro', 'Plus', 'Max', 'Ultra', 'Básico', 'Industrial', 'Premium', 'Ligero',
+    'Reforzado', 'Compacto', 'Flexible', 'Térmico', 'Resistente', 'Clásico',
+    'Avanzado', 'Estándar', 'Extra', 'Económico', 'Profesional', 'Certificado',
+]
+
+DESCRIPTION_WORDS = [
+    'producto', 'seguridad', 'industrial', 'protección', 'resistente', 'uso',
+    'trabajo', 'calidad', 'norma', 'certificado', 'material', 'diseño',
+    'ergonómico', 'durable', 'liviano', 'alta', 'visibilidad', 'ajustable',
+    'impacto', 'temperatura', 'químicos', 'cortes', 'obra', 'planta',
+    'almacén', 'operario', 'equipo', 'personal', 'riesgo', 'señal', 'para',
+    'con', 'de', 'el', 'la', 'en', 'y', 'su', 'todo', 'tipo',
+]
+
+COMPANY_PREFIXES = [
+    'Seguridad', 'Protecciones', 'Industrias', 'Suministros', 'Distribuidora',
+    'Comercial', 'Equipos', 'Grupo', 'Insumos', 'Soluciones',
+]
+
+COMPANY_NAMES = [
+    'Andina', 'del Norte', 'Central', 'del Pacífico', 'Atlántico', 'Horizonte',
+    'Integral', 'Nacional', 'Continental', 'Express', 'Total', 'Global',
+    'Colombia', 'Industrial', 'del Valle', 'Santander', 'Caribe', 'Sur',
+    'Oriente', 'Capital',
+]
+
+COMPANY_SUFFIXES = ['S.A.', 'S.A.S.', 'Ltda.', 'y Cía.']
+
+SUPPLIERS = [
+    f"{prefix} {name} {suffix}"
+    for prefix in COMPANY_PREFIXES
+    for name in COMPANY_NAMES
+    for suffix in COMPANY_SUFFIXES
+]
+
+# Los productos se generan en bloques de tamaño fijo con una semilla por
+# bloque: el resultado no depende del tamaño de lote con que se consuman
+BLOCK_SIZE = 10000
+
+DESCRIPTION_LENGTH = 28
+DESCRIPTION_MAX_CHARS = 200
+
+def generate_product_sku(category_name, product_type, index):
+    """Generar SKU único"""
+    category_code = ''.join([c[0].upper() for c in category_name.split()[:2]])
+    product_code = ''.join([c[0].upper() for c in product_type.split()[:2]])
+    return f"{category_code}-{product_code}-{index:06d}"
+
+def block_random(seed, label, block):
+    """Random con semilla derivada de (seed, label, block), estable entre ejecuciones"""
+    digest = hashlib.sha256(f"{seed}:{label}:{block}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def _generate_block(seed, block, count):
+    """
+    Generar los primeros `count` productos del bloque `block` con elecciones
+    en lote. Se sortea siempre el bloque completo para que un dataset pequeño
+    sea prefijo exacto de uno más grande con la misma semilla.
+    """
+    rng = block_random(seed, 'products', block)
+    start = block * BLOCK_SIZE
+    size = BLOCK_SIZE
+
+    categories = rng.choices(CATEGORIES, k=size)
+    type_draws = [rng.random() for _ in range(size)]
+    name_words = rng.choices(NAME_WORDS, k=size)
+    words = rng.choices(DESCRIPTION_WORDS, k=size * DESCRIPTION_LENGTH)
+    prices = [rng.randint(500, 50000) for _ in range(size)]
+    stocks = [rng.randint(0, 1000) for _ in range(size)]
+    min_levels = [rng.randint(5, 50) for _ in range(size)]
+    suppliers = rng.choices(SUPPLIERS, k=size)
+
+    for i in range(count):
+        category_name = categories[i]
+        types = PRODUCT_TYPES[category_name]
+        product_type = types[int(type_draws[i] * len(types))]
+        description_words = words[i * DESCRIPTION_LENGTH:(i + 1) * DESCRIPTION_LENGTH]
+        description = ' '.join(description_words).capitalize()
+        if len(description) >= DESCRIPTION_MAX_CHARS:
+            # Recortar en el último espacio para no partir palabras
+            description = description[:DESCRIPTION_MAX_CHARS - 1].rsplit(' ', 1)[0]
+        description += '.'
+
+        yield {
+            'sku': generate_product_sku(category_name, product_type, start + i),
+            'name': f"{product_type} {name_words[i]}",
+            'description': description,
+            'category': category_name,
+            'unit_price': Decimal(prices[i]).scaleb(-2),
+            'stock_quantity': stocks[i],
+            'min_stock_level': min_levels[i],
+            'supplier': suppliers[i],
+        }
+
+def random_sentence(rng, words=8):
+    """Frase corta del vocabulario fijo (sustituye a fake.sentence())"""
+    return ' '.join(rng.choices(DESCRIPTION_WORDS, k=words)).capitalize() + '.'
+
+def generate_products(seed, count):
+    """
+    Generar `count` productos deterministas para la semilla dada.
+    Cada producto es un dict con los campos de Product; 'category' es el nombre.
+    """
+    for block in range((count + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        block_count = min(BLOCK_SIZE, count - block * BLOCK_SIZE)
+        yield from _generate_block(seed, block, block_count)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generar un dataset determinista de productos en CSV')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del dataset (default: 42)')
+    parser.add_argument('--products', type=int, default=100000,
+                        help='Número de productos, p.ej. 10000, 100000, 1000000 (default: 100000)')
+    parser.add_argument('--output', default='-', help='Archivo CSV de salida (default: stdout)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    columns = [
+        'sku', 'name', 'description', 'category', 'unit_price',
+        'stock_quantity', 'min_stock_level', 'supplier',
+    ]
+    digest = hashlib.sha256()
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for row in generate_products(args.seed, args.products):
+            values = [row[column] for column in columns]
+            writer.writerow(values)
+            digest.update(('\t'.join(str(v) for v in values) + '\n').encode('utf-8'))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"sha256 del dataset (seed={args.seed}, productos={args.products}): {digest.hexdigest()}",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
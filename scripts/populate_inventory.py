@@ -2,9 +2,23 @@
 """
 Script para poblar la base de datos con 100,000 productos de inventario
 y sincronizarlos a MongoDB (CQRS)
+
+Con --seed los datos salen del generador determinista (dataset_generator.py)
+y el dataset es idéntico en cada ejecución para la misma semilla y tamaño.
+
+El modo normal registra cada cambio en el outbox, así que el relay repara
+cualquier sincronización fallida. El modo rápido (--fast) escribe en lote sin
+outbox: si algún lote no llega a MongoDB se lanza una resincronización
+completa al final, y si la carga se interrumpe hay que ejecutar
+sync_inventory.py.
 """
 import os
+import io
+import csv
 import sys
+import time
+import argparse
+import itertools
 import django
 from faker import Faker
 import random
@@ -15,39 +29,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_service.settings')
 django.setup()
 
+from django.db import connection, transaction
+from django.utils import timezone
 from inventory.models import ProductCategory, Product, InventoryTransaction
-from inventory.mongodb_client import sync_product_to_mongodb
+from inventory.mongodb_client import sync_product_to_mongodb, bulk_sync_products, rebuild_inventory_stats
+from inventory.outbox import record_stock_transaction, save_product
+from dataset_generator import (
+    CATEGORIES, PRODUCT_TYPES, block_random, generate_product_sku, generate_products,
+    random_sentence
+)
 
 fake = Faker('es_ES')
 
-# Categorías de productos de seguridad
-CATEGORIES = [
-    'Guantes de Seguridad',
-    'Señalizaciones',
-    'Cascos de Protección',
-    'Gafas de Seguridad',
-    'Calzado de Seguridad',
-    'Chalecos Reflectantes',
-    'Extintores',
-    'Botiquines',
-    'Cintas de Seguridad',
-    'Conos de Tráfico'
-]
-
-# Tipos de productos por categoría
-PRODUCT_TYPES = {
-    'Guantes de Seguridad': ['Guantes Nitrilo', 'Guantes Látex', 'Guantes Cuero', 'Guantes Anticorte'],
-    'Señalizaciones': ['Señal Prohibido', 'Señal Advertencia', 'Señal Obligatorio', 'Señal Información'],
-    'Cascos de Protección': ['Casco Clase A', 'Casco Clase B', 'Casco Clase C', 'Casco con Visera'],
-    'Gafas de Seguridad': ['Gafas Anti-Vaho', 'Gafas Anti-Rayos UV', 'Gafas de Seguridad Básicas'],
-    'Calzado de Seguridad': ['Botas de Seguridad', 'Zapatos de Seguridad', 'Botas Impermeables'],
-    'Chalecos Reflectantes': ['Chaleco Clase 2', 'Chaleco Clase 3', 'Chaleco con Bolsillos'],
-    'Extintores': ['Extintor ABC', 'Extintor CO2', 'Extintor Agua', 'Extintor Polvo'],
-    'Botiquines': ['Botiquín Básico', 'Botiquín Completo', 'Botiquín Industrial'],
-    'Cintas de Seguridad': ['Cinta Amarilla', 'Cinta Roja', 'Cinta Blanca', 'Cinta Reflectante'],
-    'Conos de Tráfico': ['Cono 45cm', 'Cono 60cm', 'Cono 75cm', 'Cono con Luz']
-}
-
 def create_categories():
     """Crear categorías de productos"""
     categories = {}
@@ -60,41 +53,52 @@ def create_categories():
         print(f"✓ Categoría creada: {cat_name}")
     return categories
 
-def generate_product_sku(category_name, product_type, index):
-    """Generar SKU único"""
-    category_code = ''.join([c[0].upper() for c in category_name.split()[:2]])
-    product_code = ''.join([c[0].upper() for c in product_type.split()[:2]])
-    return f"{category_code}-{product_code}-{index:06d}"
+def generate_product(categories, index):
+    """Generar un producto aleatorio en memoria (sin guardar)"""
+    # Seleccionar categoría aleatoria
+    category_name = random.choice(CATEGORIES)
+    category = categories[category_name]
+    
+    # Seleccionar tipo de producto
+    product_type = random.choice(PRODUCT_TYPES[category_name])
+    
+    # Generar SKU único
+    sku = generate_product_sku(category_name, product_type, index)
+    
+    return Product(
+        sku=sku,
+        name=f"{product_type} {fake.word().capitalize()}",
+        description=fake.text(max_nb_chars=200),
+        category=category,
+        unit_price=Decimal(str(round(random.uniform(5.00, 500.00), 2))),
+        stock_quantity=random.randint(0, 1000),
+        min_stock_level=random.randint(5, 50),
+        supplier=fake.company()
+    )
+
+def iter_products(categories, num_products, seed=None):
+    """
+    Productos en memoria: con semilla usa el generador determinista
+    (dataset_generator), sin semilla usa Faker
+    """
+    if seed is None:
+        for i in range(num_products):
+            yield generate_product(categories, i)
+        return
+    for row in generate_products(seed, num_products):
+        row['category'] = categories[row['category']]
+        yield Product(**row)
 
-def create_products(categories, num_products=100000):
+def create_products(categories, num_products=100000, seed=None):
     """Crear productos y sincronizarlos a MongoDB"""
     print(f"\n📦 Creando {num_products} productos...")
     
     created = 0
     synced = 0
     
-    for i in range(num_products):
-        # Seleccionar categoría aleatoria
-        category_name = random.choice(CATEGORIES)
-        category = categories[category_name]
-        
-        # Seleccionar tipo de producto
-        product_type = random.choice(PRODUCT_TYPES[category_name])
-        
-        # Generar SKU único
-        sku = generate_product_sku(category_name, product_type, i)
-        
-        # Crear producto
-        product = Product.objects.create(
-            sku=sku,
-            name=f"{product_type} {fake.word().capitalize()}",
-            description=fake.text(max_nb_chars=200),
-            category=category,
-            unit_price=Decimal(str(round(random.uniform(5.00, 500.00), 2))),
-            stock_quantity=random.randint(0, 1000),
-            min_stock_level=random.randint(5, 50),
-            supplier=fake.company()
-        )
+    for i, product in enumerate(iter_products(categories, num_products, seed)):
+        # Crear producto (con su evento de outbox en la misma transacción)
+        save_product(product)
         
         created += 1
         
@@ -111,15 +115,80 @@ def create_products(categories, num_products=100000):
     
     return created, synced
 
-def create_transactions(products, num_transactions=10000):
+PRODUCT_COPY_COLUMNS = [
+    'sku', 'name', 'description', 'category_id', 'unit_price', 'stock_quantity',
+    'min_stock_level', 'supplier', 'transaction_count', 'created_at', 'updated_at',
+]
+
+def copy_products(products):
+    """Insertar un lote de productos con COPY desde un buffer CSV en memoria"""
+    now = timezone.now()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for product in products:
+        product.created_at = product.updated_at = now
+        writer.writerow([
+            product.sku, product.name, product.description, product.category_id,
+            product.unit_price, product.stock_quantity, product.min_stock_level,
+            product.supplier, 0, now.isoformat(), now.isoformat(),
+        ])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY products ({', '.join(PRODUCT_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+def create_products_fast(categories, num_products=100000, chunk_size=5000, use_copy=False, seed=None):
+    """
+    Carga rápida: genera productos por lotes, los inserta con bulk_create
+    (o COPY) y los sincroniza a MongoDB con un bulk_write por lote
+    """
+    method = 'COPY' if use_copy else 'bulk_create'
+    print(f"\n📦 Creando {num_products} productos ({method}, lotes de {chunk_size})...")
+    
+    start_time = time.time()
+    created = 0
+    synced = 0
+    
+    generated = iter_products(categories, num_products, seed)
+    while True:
+        products = list(itertools.islice(generated, chunk_size))
+        if not products:
+            break
+        
+        with transaction.atomic():
+            if use_copy:
+                copy_products(products)
+            else:
+                Product.objects.bulk_create(products, batch_size=chunk_size)
+        created += len(products)
+        
+        # Sincronizar a MongoDB (CQRS) con un solo bulk_write
+        ok, _ = bulk_sync_products(products, batch_size=chunk_size, track_stats=False)
+        synced += ok
+        
+        elapsed = time.time() - start_time
+        print(f"  Progreso: {created}/{num_products} productos creados, {synced} sincronizados a MongoDB "
+              f"({created / elapsed if elapsed > 0 else 0:.0f} productos/s)")
+    
+    # Estadísticas materializadas del read model: una agregación al final
+    rebuild_inventory_stats()
+    
+    print(f"\n✅ Completado: {created} productos creados en PostgreSQL")
+    print(f"✅ Sincronizados: {synced} productos en MongoDB (CQRS)")
+    
+    return created, synced
+
+def create_transactions(products, num_transactions=10000, rng=random, make_note=fake.sentence):
     """Crear transacciones de inventario para auditoría"""
     print(f"\n📝 Creando {num_transactions} transacciones...")
     
     created = 0
     for _ in range(num_transactions):
-        product = random.choice(products)
-        transaction_type = random.choice(['IN', 'OUT', 'ADJ'])
-        quantity = random.randint(1, 100)
+        product = rng.choice(products)
+        transaction_type = rng.choice(['IN', 'OUT', 'ADJ'])
+        quantity = rng.randint(1, 100)
         
         previous_stock = product.stock_quantity
         if transaction_type == 'IN':
@@ -127,21 +196,18 @@ def create_transactions(products, num_transactions=10000):
         elif transaction_type == 'OUT':
             new_stock = max(0, previous_stock - quantity)
         else:  # ADJ
-            new_stock = previous_stock + random.randint(-50, 50)
+            new_stock = previous_stock + rng.randint(-50, 50)
         
-        InventoryTransaction.objects.create(
-            product=product,
-            transaction_type=transaction_type,
-            quantity=quantity,
-            previous_stock=previous_stock,
-            new_stock=new_stock,
-            notes=fake.sentence()
+        # Transacción + stock + outbox en una sola transacción de PostgreSQL;
+        # el relay (manage.py relay_outbox) propaga el cambio a MongoDB
+        record_stock_transaction(
+            product,
+            transaction_type,
+            quantity,
+            new_stock,
+            notes=make_note()
         )
         
-        # Actualizar stock del producto
-        product.stock_quantity = new_stock
-        product.save()
-        
         created += 1
         
         if created % 1000 == 0:
@@ -150,7 +216,81 @@ def create_transactions(products, num_transactions=10000):
     print(f"✅ {created} transacciones creadas")
     return created
 
+def create_transactions_fast(products, num_transactions=10000, chunk_size=5000, rng=random,
+                             make_note=fake.sentence):
+    """
+    Carga rápida de transacciones: el stock final se calcula en memoria,
+    las transacciones se insertan con bulk_create y los productos afectados
+    (stock y transaction_count) se actualizan con bulk_update y un bulk_write
+    a MongoDB al final
+    """
+    print(f"\n📝 Creando {num_transactions} transacciones (bulk_create)...")
+    
+    transactions = []
+    touched = {}
+    for _ in range(num_transactions):
+        product = rng.choice(products)
+        transaction_type = rng.choice(['IN', 'OUT', 'ADJ'])
+        quantity = rng.randint(1, 100)
+        
+        previous_stock = product.stock_quantity
+        if transaction_type == 'IN':
+            new_stock = previous_stock + quantity
+        elif transaction_type == 'OUT':
+            new_stock = max(0, previous_stock - quantity)
+        else:  # ADJ
+            new_stock = previous_stock + rng.randint(-50, 50)
+        
+        transactions.append(InventoryTransaction(
+            product=product,
+            transaction_type=transaction_type,
+            quantity=quantity,
+            previous_stock=previous_stock,
+            new_stock=new_stock,
+            notes=make_note()
+        ))
+        product.stock_quantity = new_stock
+        product.transaction_count += 1
+        touched[product.pk] = product
+    
+    now = timezone.now()
+    for product in touched.values():
+        product.updated_at = now
+    
+    with transaction.atomic():
+        InventoryTransaction.objects.bulk_create(transactions, batch_size=chunk_size)
+        Product.objects.bulk_update(
+            list(touched.values()), ['stock_quantity', 'transaction_count', 'updated_at'],
+            batch_size=chunk_size
+        )
+    
+    synced, failed = bulk_sync_products(touched.values(), batch_size=chunk_size)
+    
+    print(f"✅ {len(transactions)} transacciones creadas, {synced} productos actualizados en MongoDB")
+    return len(transactions), failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Poblar la base de datos de inventario')
+    parser.add_argument('--products', type=int, default=100000,
+                        help='Número de productos a crear (default: 100000)')
+    parser.add_argument('--transactions', type=int, default=10000,
+                        help='Número de transacciones a crear (default: 10000)')
+    parser.add_argument('--fast', action='store_true',
+                        help='Carga rápida con bulk_create y bulk_write a MongoDB por lotes')
+    parser.add_argument('--copy', action='store_true',
+                        help='Insertar productos con COPY de PostgreSQL (requiere --fast)')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help='Filas por lote en modo rápido (default: 5000)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Semilla del generador determinista (sin Faker); mismo dataset en cada ejecución')
+    args = parser.parse_args()
+    if args.copy and not args.fast:
+        parser.error('--copy solo está disponible en modo rápido (--fast)')
+    return args
+
 def main():
+    args = parse_args()
+    
     print("=" * 60)
     print("🚀 POBLACIÓN DE BASE DE DATOS - PROVESI")
     print("=" * 60)
@@ -160,13 +300,33 @@ def main():
     categories = create_categories()
     
     # Crear productos
-    num_products = 100000
-    created, synced = create_products(categories, num_products)
+    if args.fast:
+        created, synced = create_products_fast(
+            categories, args.products, chunk_size=args.chunk_size, use_copy=args.copy, seed=args.seed
+        )
+    else:
+        created, synced = create_products(categories, args.products, seed=args.seed)
     
     # Crear algunas transacciones
     print("\n📊 Creando transacciones de inventario...")
-    products = list(Product.objects.all()[:1000])  # Tomar muestra para transacciones
-    create_transactions(products, 10000)
+    # Muestra estable por SKU: con --seed las transacciones son reproducibles
+    products = list(Product.objects.select_related('category').order_by('sku')[:1000])
+    rng, make_note = random, fake.sentence
+    if args.seed is not None:
+        rng = block_random(args.seed, 'transactions', 0)
+        make_note = lambda: random_sentence(rng)
+    if args.fast:
+        _, failed = create_transactions_fast(
+            products, args.transactions, chunk_size=args.chunk_size, rng=rng, make_note=make_note
+        )
+        # Sin outbox en modo rápido: lo que no llegó a MongoDB se repara con una resincronización
+        failed += created - synced
+        if failed:
+            print(f"\n⚠️  {failed} productos no llegaron a MongoDB: resincronización completa...")
+            from sync_inventory import sync_all_products
+            sync_all_products(batch_size=args.chunk_size)
+    else:
+        create_transactions(products, args.transactions, rng=rng, make_note=make_note)
     
     print("\n" + "=" * 60)
     print("✅ POBLACIÓN COMPLETADA")
@@ -174,7 +334,7 @@ def main():
     print(f"Total productos en PostgreSQL: {Product.objects.count()}")
     print(f"Total categorías: {ProductCategory.objects.count()}")
     print(f"Total transacciones: {InventoryTransaction.objects.count()}")
-    print("\n💡 Nota: Verificar sincronización en MongoDB manualmente")
+    print("\n💡 Nota: Los cambios de stock se propagan a MongoDB con `python manage.py relay_outbox`")
 
 if __name__ == '__main__':
     main()
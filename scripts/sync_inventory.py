@@ -5,6 +5,10 @@ Script para sincronizar todos los productos de PostgreSQL a MongoDB (CQRS)
 """
 import os
 import sys
+import time
+import argparse
+from datetime import datetime
+import multiprocessing
 import django
 
 # Setup Django
@@ -12,36 +16,235 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_service.settings')
 django.setup()
 
-from inventory.models import Product
-from inventory.mongodb_client import sync_product_to_mongodb
+from django.db.models import Max, Min
+from inventory.models import Product, ProductCategory
+from inventory.mongodb_client import (
+    bulk_sync_products, get_sync_metadata, rebuild_inventory_stats, save_sync_metadata,
+    sync_category_names
+)
 
-def sync_all_products():
-    """Sincronizar todos los productos a MongoDB"""
+def current_state():
+    """Marca de agua actual (máximo updated_at) y mapa {id: nombre} de categorías"""
+    watermark = Product.objects.aggregate(wm=Max('updated_at'))['wm']
+    categories = dict(ProductCategory.objects.values_list('id', 'name'))
+    return watermark, categories
+
+def save_state(watermark, categories):
+    """Guardar el estado sincronizado para la siguiente ejecución incremental"""
+    if watermark is not None:
+        save_sync_metadata(watermark.isoformat(), categories)
+        print(f"💾 Marca de agua guardada: {watermark.isoformat()}")
+
+def sync_all_products(batch_size=1000):
+    """
+    Sincronizar todos los productos a MongoDB en lotes
+
+    Los productos se leen en streaming (select_related + iterator) y se
+    escriben con bulk_write desordenado, un round trip por lote.
+    """
     print("🔄 Sincronizando productos de PostgreSQL a MongoDB...")
-    
-    products = Product.objects.all()
+
+    # El estado se toma antes de leer: los cambios posteriores quedan para la próxima ejecución
+    watermark, categories = current_state()
+
+    products = Product.objects.select_related('category').order_by('pk')
     total = products.count()
-    synced = 0
-    failed = 0
-    
-    print(f"Total productos a sincronizar: {total}")
-    
-    for i, product in enumerate(products, 1):
-        if sync_product_to_mongodb(product):
-            synced += 1
-        else:
-            failed += 1
-        
-        if i % 1000 == 0:
-            print(f"  Progreso: {i}/{total} - Sincronizados: {synced}, Fallidos: {failed}")
-    
+
+    print(f"Total productos a sincronizar: {total} (lotes de {batch_size})")
+
+    start_time = time.time()
+
+    def report(processed, synced, failed):
+        elapsed = time.time() - start_time
+        rate = processed / elapsed if elapsed > 0 else 0
+        print(f"  Progreso: {processed}/{total} - Sincronizados: {synced}, Fallidos: {failed} "
+              f"({rate:.0f} productos/s)")
+
+    synced, failed = bulk_sync_products(
+        products.iterator(chunk_size=batch_size),
+        batch_size=batch_size,
+        on_batch=report,
+        track_stats=False
+    )
+
+    elapsed = time.time() - start_time
+
     print("\n" + "=" * 60)
     print("✅ SINCRONIZACIÓN COMPLETADA")
     print("=" * 60)
     print(f"Total procesados: {total}")
     print(f"✅ Sincronizados exitosamente: {synced}")
     print(f"❌ Fallidos: {failed}")
+    print(f"⏱️  Tiempo total: {elapsed:.2f} s ({total / elapsed if elapsed > 0 else 0:.0f} productos/s)")
 
-if __name__ == '__main__':
-    sync_all_products()
+    # Estadísticas materializadas: se recalculan una vez al final
+    rebuild_inventory_stats()
+
+    if not failed:
+        save_state(watermark, categories)
+
+    return synced, failed
+
+def sync_incremental(batch_size=1000):
+    """
+    Sincronizar solo los productos con updated_at >= la última marca de agua
 
+    Los renombres de categoría se propagan con un update_many por categoría
+    a todos los documentos afectados. Sin marca de agua previa hace una
+    sincronización completa.
+    """
+    metadata = get_sync_metadata()
+    if not metadata.get('watermark'):
+        print("⚠️  No hay marca de agua previa, se hace sincronización completa")
+        return sync_all_products(batch_size=batch_size)
+
+    previous = datetime.fromisoformat(metadata['watermark'])
+    print(f"🔄 Sincronización incremental desde {previous.isoformat()}...")
+
+    watermark, categories = current_state()
+
+    renamed, modified = sync_category_names(categories, metadata.get('categories', {}))
+    print(f"Categorías renombradas: {renamed} ({modified} documentos actualizados)")
+
+    # >= para no perder filas con el mismo updated_at que la marca anterior
+    products = (
+        Product.objects.select_related('category')
+        .filter(updated_at__gte=previous)
+        .order_by('updated_at')
+    )
+    total = products.count()
+    print(f"Productos modificados: {total}")
+
+    start_time = time.time()
+
+    def report(processed, synced, failed):
+        print(f"  Progreso: {processed}/{total} - Sincronizados: {synced}, Fallidos: {failed}")
+
+    synced, failed = bulk_sync_products(
+        products.iterator(chunk_size=batch_size),
+        batch_size=batch_size,
+        on_batch=report
+    )
+
+    elapsed = time.time() - start_time
+
+    print("\n" + "=" * 60)
+    print("✅ SINCRONIZACIÓN INCREMENTAL COMPLETADA")
+    print("=" * 60)
+    print(f"✅ Sincronizados exitosamente: {synced}")
+    print(f"❌ Fallidos: {failed}")
+    print(f"⏱️  Tiempo total: {elapsed:.2f} s")
+
+    # Si hubo fallos se conserva la marca anterior para reintentarlos
+    if not failed:
+        save_state(watermark or previous, categories)
+
+    return synced, failed
+
+def partition_pk_ranges(workers):
+    """Dividir el rango de PKs de products en hasta `workers` rangos [lo, hi]"""
+    bounds = Product.objects.aggregate(lo=Min('pk'), hi=Max('pk'))
+    lo, hi = bounds['lo'], bounds['hi']
+    if lo is None:
+        return []
+
+    size = (hi - lo + 1 + workers - 1) // workers
+    return [
+        (start, min(start + size - 1, hi))
+        for start in range(lo, hi + 1, size)
+    ]
+
+def sync_partition(task):
+    """
+    Sincronizar un rango de PKs (se ejecuta en un proceso hijo)
+
+    Con el contexto 'spawn' cada proceso importa este módulo desde cero,
+    por lo que tiene su propia conexión de Django y su propio MongoClient.
+    """
+    index, lo, hi, batch_size = task
+    start_time = time.time()
+
+    products = (
+        Product.objects.select_related('category')
+        .filter(pk__gte=lo, pk__lte=hi)
+        .order_by('pk')
+    )
+
+    def report(processed, synced, failed):
+        print(f"  [partición {index}] Progreso: {processed} - Sincronizados: {synced}, Fallidos: {failed}")
+
+    synced, failed = bulk_sync_products(
+        products.iterator(chunk_size=batch_size),
+        batch_size=batch_size,
+        on_batch=report,
+        track_stats=False
+    )
+
+    return {
+        'index': index,
+        'pk_range': (lo, hi),
+        'synced': synced,
+        'failed': failed,
+        'elapsed': time.time() - start_time,
+    }
+
+def sync_all_products_parallel(workers, batch_size=1000):
+    """Sincronizar todos los productos repartiendo rangos de PK entre procesos"""
+    print(f"🔄 Sincronizando productos de PostgreSQL a MongoDB con {workers} procesos...")
+
+    watermark, categories = current_state()
+    partitions = partition_pk_ranges(workers)
+    tasks = [(i, lo, hi, batch_size) for i, (lo, hi) in enumerate(partitions)]
+    for i, lo, hi, _ in tasks:
+        print(f"  Partición {i}: pk {lo}-{hi}")
+
+    start_time = time.time()
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes=len(tasks) or 1) as pool:
+        results = pool.map(sync_partition, tasks)
+
+    elapsed = time.time() - start_time
+    synced = sum(r['synced'] for r in results)
+    failed = sum(r['failed'] for r in results)
+    total = synced + failed
+
+    print("\n" + "=" * 60)
+    print("✅ SINCRONIZACIÓN COMPLETADA")
+    print("=" * 60)
+    for r in results:
+        lo, hi = r['pk_range']
+        count = r['synced'] + r['failed']
+        rate = count / r['elapsed'] if r['elapsed'] > 0 else 0
+        print(f"  Partición {r['index']} (pk {lo}-{hi}): {r['synced']} sincronizados, "
+              f"{r['failed']} fallidos en {r['elapsed']:.2f} s ({rate:.0f} productos/s)")
+    print(f"Total procesados: {total}")
+    print(f"✅ Sincronizados exitosamente: {synced}")
+    print(f"❌ Fallidos: {failed}")
+    print(f"⏱️  Tiempo total: {elapsed:.2f} s ({total / elapsed if elapsed > 0 else 0:.0f} productos/s)")
+
+    rebuild_inventory_stats()
+
+    if not failed:
+        save_state(watermark, categories)
+
+    return synced, failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Sincronizar productos de PostgreSQL a MongoDB (CQRS)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Productos por lote de lectura y de bulk_write (default: 1000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos en paralelo, cada uno con un rango de PKs (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Sincronizar solo los productos modificados desde la última marca de agua')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.incremental:
+        sync_incremental(batch_size=args.batch_size)
+    elif args.workers > 1:
+        sync_all_products_parallel(args.workers, batch_size=args.batch_size)
+    else:
+        sync_all_products(batch_size=args.batch_size)